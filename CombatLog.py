@@ -1,10 +1,13 @@
+from collections import deque
 import pygame as pg
 
 from Dice import DiceGroup, Die
+from fonts import get_font, text_width
 from tickers import Skill
 
 class CombatLog:
-    LOG_LENGTH_LIMIT = 48
+    PADDING = 10
+    LINE_SPACING = 5
     def __init__(self, screen, rect, font=None, max_messages=10):
         """
         Initialize the CombatLog.
@@ -12,34 +15,68 @@ class CombatLog:
         :param screen: The pygame screen where the log will be drawn.
         :param rect: A pygame.Rect defining the position and size of the log window.
         :param font: A pygame.Font object for rendering text.
-        :param max_messages: Maximum number of messages to keep in the log.
+        :param max_messages: Maximum number of lines to keep in the log.
         """
         self.screen = screen
         self.rect = rect
-        self.font = font if font else pg.font.Font(None, 18)
+        self.font = font if font else get_font(None, 18)
         self.max_messages = max_messages
-        self.messages = []
+        # rendered lines, the oldest fall off the front on their own
+        self.lines: deque[pg.Surface] = deque(maxlen=max_messages)
+        self.surface: pg.Surface = None
         self.color = (255, 255, 255)
 
-    def check_messages(self):
-        while len(self.messages) > self.max_messages:
-            self.messages.pop(0)
-
     def add_message(self, message: str, color: tuple[int, int, int]):
-        if len(message) > self.LOG_LENGTH_LIMIT:
-            words = message.split(' ')
-            print('words', words)
-            for _ in range(2):
-                half_of_message = ''
-                while len(half_of_message) < self.LOG_LENGTH_LIMIT and words:
-                    half_of_message += words.pop(0)+' '
-
-                self.messages.append((half_of_message, color))
-            
-        else:
-            self.messages.append((message, color))
+        for line in self.wrap(message, self.rect.width - 2*self.PADDING):
+            self.lines.append(self.font.render(line, True, color))
 
-        self.check_messages()
+        self.surface = None
+
+    def wrap(self, message: str, max_width: int) -> list[str]:
+        """
+        Split a message into lines no wider than max_width pixels,
+        a word too wide for a line of its own is split between letters.
+        Line widths are summed from the cached word widths.
+        """
+        space = text_width(self.font, ' ')
+        lines, line, line_width, words = [], '', 0, 0
+        for word in message.split():
+            word_width = text_width(self.font, word)
+            candidate = f'{line} {word}' if line else word
+            candidate_width = line_width + space + word_width if line else word_width
+            if self.fits(candidate, candidate_width, 2*words + 1, max_width):
+                line, line_width, words = candidate, candidate_width, words + 1
+                continue
+
+            if line:
+                lines.append(line)
+            if self.fits(word, word_width, 1, max_width):
+                line, line_width, words = word, word_width, 1
+                continue
+
+            line = ''
+            for char in word:
+                if line and self.font.size(line + char)[0] > max_width:
+                    lines.append(line)
+                    line = ''
+                line += char
+            line_width, words = self.font.size(line)[0], 1
+
+        if line:
+            lines.append(line)
+        return lines
+
+    def fits(self, text: str, summed_width: int, pieces: int, max_width: int) -> bool:
+        """
+        Summed widths are off from the real one by less than a pixel
+        per piece (word or space) from rounding, so only text within
+        that margin of max_width is measured as a whole.
+        """
+        if summed_width + pieces <= max_width:
+            return True
+        if summed_width - pieces > max_width:
+            return False
+        return self.font.size(text)[0] <= max_width
 
     def add_attack_message(self, attack_data: dict, user_name:str, target_name: str, color=None):
         """
@@ -140,15 +177,23 @@ class CombatLog:
                   
     def draw(self):
         """
-        Draw the combat log onto the screen.
+        Draw the combat log onto the screen, the log is only
+        rendered again after a message was added.
         """
+        if self.surface is None:
+            self.surface = self.render()
+        self.screen.blit(self.surface, self.rect)
+
+    def render(self) -> pg.Surface:
+        surface = pg.Surface(self.rect.size)
         # Draw the log background
-        pg.draw.rect(self.screen, (30, 30, 30), self.rect)
-        pg.draw.rect(self.screen, (200, 200, 200), self.rect, 2)  # Border
-
-        # Render messages, starting from the most recent
-        y_offset = self.rect.y + 10
-        for message, color in self.messages:
-            text_surface = self.font.render(message, True, color)
-            self.screen.blit(text_surface, (self.rect.x + 10, y_offset))
-            y_offset += text_surface.get_height() + 5
+        surface.fill((30, 30, 30))
+        pg.draw.rect(surface, (200, 200, 200), surface.get_rect(), 2)  # Border
+
+        # Messages from the oldest down to the most recent
+        y_offset = self.PADDING
+        for line in self.lines:
+            surface.blit(line, (self.PADDING, y_offset))
+            y_offset += line.get_height() + self.LINE_SPACING
+
+        return surface
@@ -1,41 +1,74 @@
 from __future__ import annotations
 import random
+import numpy as np
+
+# batch rolls draw from their own generator, seed it for repeatable runs
+batch_rng = np.random.default_rng()
 
 
 class Die:
     def __init__(self, size: int):
         self.size = size
-    
+
     def roll(self, crit_roll=False) -> int:
-        number_of_rolls = 2 if crit_roll else 1
-        return sum([random.randint(1, self.size) for _ in range(number_of_rolls)])
-    
+        roll = random.randint(1, self.size)
+        return roll + random.randint(1, self.size) if crit_roll else roll
+
     def __repr__(self):
         return f'1d{self.size}'
-    
+
 class DiceGroup:
+    '''
+    dice kept as how many there are of each size, effects keep
+    stacking dice onto damage groups but rolling and removing
+    only ever walk the few distinct sizes
+    '''
     def __init__(self, dice: list[Die]):
-        self.dice = dice
+        self.counts: dict[int, int] = {}
+        for die in dice:
+            self.add_die(die)
+
+    def roll(self, crit_roll=False) -> int:
+        rolls_per_die = 2 if crit_roll else 1
+        randint = random.randint
+        return sum(randint(1, size) for size, count in self.counts.items() for _ in range(count*rolls_per_die))
+
+    def roll_batch(self, n: int, crit_roll: bool | np.ndarray = False, rng: np.random.Generator = None) -> np.ndarray:
+        '''
+        n independent rolls of the whole group in one go, crit_roll
+        can also be a bool per roll. One vector draw per die size
+        instead of an interpreter call per die per roll
+        '''
+        rng = batch_rng if rng is None else rng
+        crits = np.asarray(crit_roll, dtype=bool)
+        totals = np.zeros(n, dtype=np.int64)
+        for size, count in self.counts.items():
+            totals += rng.integers(1, size, size=(n, count), endpoint=True).sum(axis=1)
+            if crits.any():
+                totals += rng.integers(1, size, size=(n, count), endpoint=True).sum(axis=1) * crits
+        return totals
 
-    def roll(self, crit_roll=False):
-        return sum([die.roll(crit_roll) for die in self.dice])
-    
     def add_die(self, die: Die):
-        self.dice.append(die)
-    
+        self.counts[die.size] = self.counts.get(die.size, 0) + 1
+
     def add_dice(self, dice_group: DiceGroup):
-        self.dice += dice_group.dice
+        for size, count in dice_group.counts.items():
+            self.counts[size] = self.counts.get(size, 0) + count
 
     def remove(self, die: Die):
-        self.dice.remove(die)
+        count = self.counts.get(die.size, 0)
+        if not count:
+            raise ValueError(f'DiceGroup.remove: no {die} in {self}')
+
+        if count == 1:
+            del self.counts[die.size]
+        else:
+            self.counts[die.size] = count - 1
+
+    def remove_dice(self, dice_group: DiceGroup):
+        for size, count in dice_group.counts.items():
+            for _ in range(count):
+                self.remove(Die(size))
 
     def __repr__(self):
-        buckets = {}
-        for die in self.dice:
-            if die.size not in buckets:
-                buckets[die.size] = 1
-            else:
-                buckets[die.size] += 1
-        
-        return ' and '.join([f'{number}d{die_size}' for die_size, number in buckets.items()])
-        
\ No newline at end of file
+        return ' and '.join([f'{number}d{die_size}' for die_size, number in self.counts.items()])
@@ -1,29 +1,684 @@
-from typing import Any
-from pathfinding.core.grid import Grid
-from pathfinding.finder.a_star import AStarFinder
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from typing import Any, Callable
+import numpy as np
+
+
+INFINITY = float('inf')
+
+
+def to_array(values: np.ndarray) -> array:
+    '''
+    numpy results copied into an array('l'), indexing one
+    element at a time is much cheaper on those
+    '''
+    table = array('l')
+    table.frombytes(np.ascontiguousarray(values, dtype=f'i{table.itemsize}').tobytes())
+    return table
+
+
+class Grid:
+    '''
+    Flat walkability buffer of a map, tile (x, y) is at index
+    y*width + x. The scratch buffers are shared by every search
+    on the grid, a search only trusts entries stamped with its
+    own search id so nothing needs clearing between searches
+    '''
+    def __init__(self, walkable: bytes, width: int, height: int):
+        self.walkable = bytearray(walkable)
+        self.width = width
+        self.height = height
+
+        size = width * height
+        self.costs = array('l', [0]) * size
+        self.parents = array('l', [0]) * size
+        self.seen_stamps = array('l', [0]) * size
+        self.closed_stamps = array('l', [0]) * size
+        self.open_list = []
+        self.search_id = 0
+        self.walkable_neighbours = self.build_neighbours()
+
+    def new_search(self) -> int:
+        self.search_id += 1
+        self.open_list.clear()
+        return self.search_id
+
+    def index(self, pos: tuple[int, int]) -> int:
+        return pos[1] * self.width + pos[0]
+
+    def position(self, index: int) -> tuple[int, int]:
+        return index % self.width, index // self.width
+
+    def is_walkable(self, pos: tuple[int, int]) -> bool:
+        x, y = pos
+        return 0 <= x < self.width and 0 <= y < self.height and bool(self.walkable[y * self.width + x])
+
+    def neighbours(self, index: int) -> tuple[int, ...]:
+        '''
+        walkable 4-connected neighbours of a tile
+        '''
+        return self.walkable_neighbours[index]
+
+    def build_neighbours(self) -> list[tuple[int, ...]]:
+        width, height, walkable = self.width, self.height, self.walkable
+        neighbours = []
+        for index in range(width * height):
+            x, y = index % width, index // width
+            candidates = (index-1 if x > 0 else -1, index+1 if x < width-1 else -1,
+                          index-width if y > 0 else -1, index+width if y < height-1 else -1)
+            neighbours.append(tuple(n for n in candidates if n != -1 and walkable[n]))
+        return neighbours
+
+    def trace_path(self, end: int) -> list[tuple[int, int]]:
+        '''
+        follows the parents of the last search back from end
+        '''
+        path = [end]
+        while self.parents[path[-1]] != -1:
+            path.append(self.parents[path[-1]])
+
+        return [self.position(index) for index in reversed(path)]
+
+
+class AStarFinder:
+    '''
+    4-connected A* with a manhattan heuristic over a Grid.
+    Open list entries are single ints ordered by (f, h) with
+    the tile index in the lowest digits, so pushing a node
+    doesn't allocate a tuple
+    '''
+    def find_path(self, start: tuple[int, int], end: tuple[int, int], grid: Grid) -> list[tuple[int, int]]:
+        if not grid.is_walkable(end):
+            return []
+
+        search = grid.new_search()
+        width, size = grid.width, grid.width * grid.height
+        h_stride = grid.width + grid.height
+        costs, parents, neighbours = grid.costs, grid.parents, grid.walkable_neighbours
+        seen, closed, open_list = grid.seen_stamps, grid.closed_stamps, grid.open_list
+        end_x, end_y = end
+        start_index, end_index = grid.index(start), grid.index(end)
+
+        seen[start_index] = search
+        costs[start_index] = 0
+        parents[start_index] = -1
+        h = abs(start[0]-end_x) + abs(start[1]-end_y)
+        heappush(open_list, (h * h_stride + h) * size + start_index)
+
+        while open_list:
+            index = heappop(open_list) % size
+            if closed[index] == search:
+                continue
+            closed[index] = search
+
+            if index == end_index:
+                return grid.trace_path(end_index)
+
+            cost = costs[index] + 1
+            for neighbour in neighbours[index]:
+                if closed[neighbour] == search:
+                    continue
+                if seen[neighbour] == search and costs[neighbour] <= cost:
+                    continue
+
+                seen[neighbour] = search
+                costs[neighbour] = cost
+                parents[neighbour] = index
+                h = abs(neighbour % width - end_x) + abs(neighbour // width - end_y)
+                heappush(open_list, ((cost+h) * h_stride + h) * size + neighbour)
+
+        return []
+
+
+class JumpPointFinder:
+    '''
+    4-connected jump point search. Straight runs with nothing
+    forcing a turn are skipped over instead of being pushed onto
+    the open list, which is where A* spends its time on open
+    cave floors. Floors don't change so where each run stops is
+    worked out once per grid, a jump is then a table lookup plus
+    a check for the end tile being on the run
+    '''
+    def __init__(self):
+        self.grid: Grid = None
+        self.jumps: dict[tuple[int, int], array] = {}
+        self.row_runs: array = ...
+        self.column_runs: array = ...
+
+    def find_path(self, start: tuple[int, int], end: tuple[int, int], grid: Grid) -> list[tuple[int, int]]:
+        if not grid.is_walkable(end):
+            return []
+        if grid is not self.grid:
+            self.prepare(grid)
+
+        search = grid.new_search()
+        width, size = grid.width, grid.width * grid.height
+        h_stride = grid.width + grid.height
+        costs, parents = grid.costs, grid.parents
+        seen, closed, open_list = grid.seen_stamps, grid.closed_stamps, grid.open_list
+        end_x, end_y = end
+        start_index, end_index = grid.index(start), grid.index(end)
+
+        seen[start_index] = search
+        costs[start_index] = 0
+        parents[start_index] = -1
+        h = abs(start[0]-end_x) + abs(start[1]-end_y)
+        heappush(open_list, (h * h_stride + h) * size + start_index)
+
+        while open_list:
+            index = heappop(open_list) % size
+            if closed[index] == search:
+                continue
+            closed[index] = search
+
+            if index == end_index:
+                return self.expand_path(grid.trace_path(end_index))
+
+            x, y = index % width, index // width
+            for dx, dy in self.steps(grid, index):
+                neighbour = self.jump(index + dx + dy*width, dx, dy, end_index)
+                if neighbour == -1 or closed[neighbour] == search:
+                    continue
+
+                jump_x, jump_y = neighbour % width, neighbour // width
+                cost = costs[index] + abs(jump_x-x) + abs(jump_y-y)
+                if seen[neighbour] == search and costs[neighbour] <= cost:
+                    continue
+
+                seen[neighbour] = search
+                costs[neighbour] = cost
+                parents[neighbour] = index
+                h = abs(jump_x-end_x) + abs(jump_y-end_y)
+                heappush(open_list, ((cost+h) * h_stride + h) * size + neighbour)
+
+        return []
+
+    def prepare(self, grid: Grid):
+        '''
+        for every tile and direction stores the first tile on the way
+        (itself included) where a path could have to turn, -1 if the
+        run hits a wall first. Runs are numbered so it is cheap to
+        tell if the end tile is on one. The tables are worked out over
+        the whole grid at once and kept as arrays for the search
+        '''
+        width, height = grid.width, grid.height
+        walkable = np.frombuffer(grid.walkable, dtype=np.uint8).reshape(height, width).astype(bool)
+        xs, ys = np.arange(width)[None, :], np.arange(height)[:, None]
+
+        right, left = self.scan_jumps(walkable)
+        # a vertical run also stops where a sideways jump would find something
+        sideways = np.zeros_like(walkable)
+        sideways[:, :-1] |= walkable[:, 1:] & (right[:, 1:] != -1)
+        sideways[:, 1:] |= walkable[:, :-1] & (left[:, :-1] != -1)
+        down, up = (jumps.T for jumps in self.scan_jumps(walkable.T, sideways.T))
+
+        def to_table(jumps, stops):
+            return to_array(np.where(jumps == -1, -1, stops))
+
+        self.grid = grid
+        # keyed by direction, on a one tile wide grid the index steps of rows and columns are the same
+        self.jumps = {(1, 0): to_table(right, ys*width + right), (-1, 0): to_table(left, ys*width + left),
+                      (0, 1): to_table(down, down*width + xs), (0, -1): to_table(up, up*width + xs)}
+        self.row_runs = to_array(self.number_runs(walkable))
+        self.column_runs = to_array(self.number_runs(walkable.T).T)
+
+    def scan_jumps(self, walkable: np.ndarray, stops: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        jumps along the rows of walkable, for both directions the column
+        of the first tile a path could have to turn at, -1 if a wall
+        comes first. A tile is one when the row above or below opens up
+        right after it was blocked, stops adds tiles that always are
+        '''
+        height, width = walkable.shape
+        padded = np.pad(walkable, 1)
+        above, below = padded[:-2, 1:-1], padded[2:, 1:-1]
+        turns_ahead = above & ~padded[:-2, :-2] | below & ~padded[2:, :-2]
+        turns_behind = above & ~padded[:-2, 2:] | below & ~padded[2:, 2:]
+        if stops is not None:
+            turns_ahead, turns_behind = turns_ahead | stops, turns_behind | stops
+
+        # nearest turn and nearest wall on each side, a jump reaches the turn if it comes first
+        columns = np.broadcast_to(np.arange(width), walkable.shape)
+        next_turn = np.minimum.accumulate(np.where(turns_ahead, columns, width)[:, ::-1], axis=1)[:, ::-1]
+        next_wall = np.minimum.accumulate(np.where(walkable, width, columns)[:, ::-1], axis=1)[:, ::-1]
+        previous_turn = np.maximum.accumulate(np.where(turns_behind, columns, -1), axis=1)
+        previous_wall = np.maximum.accumulate(np.where(walkable, -1, columns), axis=1)
+
+        forward = np.where(walkable & (next_turn < next_wall), next_turn, -1)
+        backward = np.where(walkable & (previous_turn > previous_wall), previous_turn, -1)
+        return forward, backward
+
+    def number_runs(self, walkable: np.ndarray) -> np.ndarray:
+        '''
+        gives every straight run of walkable tiles along the rows
+        its own number in reading order, walls get -1
+        '''
+        starts = walkable.copy()
+        starts[:, 1:] &= ~walkable[:, :-1]
+        return np.where(walkable, np.cumsum(starts.ravel()).reshape(walkable.shape), -1)
+
+    def jump(self, index: int, dx: int, dy: int, end: int) -> int:
+        '''
+        first jump point from index heading (dx, dy), -1 if there is none.
+        The end tile counts as one, and so does any tile of a vertical run
+        whose row holds the end tile within reach of a horizontal run
+        '''
+        stop = self.jumps[dx, dy][index]
+        if dx:
+            if self.row_runs[index] != self.row_runs[end] or (end - index) * dx < 0:
+                return stop
+            return end if stop == -1 or (stop - end) * dx > 0 else stop
+
+        width = self.grid.width
+        end_row_tile = end - end % width + index % width
+        if self.column_runs[end_row_tile] != self.column_runs[index] or self.row_runs[end_row_tile] != self.row_runs[end] \
+                or (end_row_tile - index) * dy < 0:
+            return stop
+        return end_row_tile if stop == -1 or (stop - end_row_tile) * dy > 0 else stop
+
+    def steps(self, grid: Grid, index: int) -> list[tuple[int, int]]:
+        '''
+        directions to the walkable neighbours worth jumping towards,
+        heading back to where the jump came from is never shorter
+        '''
+        row = index // grid.width
+        directions = [((neighbour > index) - (neighbour < index), 0) if neighbour // grid.width == row
+                      else (0, (neighbour > index) - (neighbour < index)) for neighbour in grid.walkable_neighbours[index]]
+
+        parent = grid.parents[index]
+        if parent == -1:
+            return directions
+
+        back = (-1 if parent < index else 1, 0) if parent // grid.width == row else (0, -1 if parent < index else 1)
+        return [direction for direction in directions if direction != back]
+
+    def expand_path(self, jump_points: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        path = jump_points[:1]
+        for (x, y), (next_x, next_y) in zip(jump_points, jump_points[1:]):
+            dx, dy = (next_x > x) - (next_x < x), (next_y > y) - (next_y < y)
+            while (x, y) != (next_x, next_y):
+                x += dx
+                y += dy
+                path.append((x, y))
+
+        return path
+
+
+class ClusterGraph:
+    '''
+    Abstract graph for hierarchical pathfinding (HPA*). The grid is
+    cut into square clusters, nodes are the tiles on both sides of
+    each opening between neighbouring clusters and the edges inside
+    a cluster come from searches that never leave it. A long search
+    runs on the graph and each hop is turned back into tiles by
+    following the search trees kept from building it
+    '''
+    CLUSTER_SIZE = 8
+    # openings at least this wide get a node at both ends instead of one in the middle
+    WIDE_ENTRANCE = 6
+
+    def __init__(self, grid: Grid, cluster_size: int = CLUSTER_SIZE):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.clusters_wide = -(-grid.width // cluster_size)
+        self.clusters = array('l', [self.cluster_of(index) for index in range(grid.width*grid.height)])
+        self.edges: dict[int, dict[int, int]] = {}
+        self.trees: dict[int, dict[int, int]] = {}
+        self.cluster_nodes: dict[int, list[int]] = {}
+        self.build()
+
+    def cluster_of(self, index: int) -> int:
+        width, size = self.grid.width, self.cluster_size
+        return index // width // size * self.clusters_wide + index % width // size
+
+    def build(self):
+        self.add_entrances()
+        for nodes in self.cluster_nodes.values():
+            for node in nodes:
+                distances, self.trees[node] = self.cluster_search(node)
+                for other in nodes:
+                    if other != node and other in distances:
+                        self.edges[node][other] = distances[other]
+
+    def add_entrances(self):
+        width, height = self.grid.width, self.grid.height
+        for border_x in range(self.cluster_size, width, self.cluster_size):
+            self.add_border([y*width + border_x-1 for y in range(height)], 1)
+        for border_y in range(self.cluster_size, height, self.cluster_size):
+            self.add_border([(border_y-1)*width + x for x in range(width)], width)
+
+    def add_border(self, tiles: list[int], step: int):
+        '''
+        tiles run along the near side of a border, step crosses it
+        '''
+        walkable, run = self.grid.walkable, []
+        for tile in tiles:
+            is_open = walkable[tile] and walkable[tile+step]
+            if is_open and run and self.clusters[tile] == self.clusters[run[-1]]:
+                run.append(tile)
+                continue
+
+            self.add_entrance(run, step)
+            run = [tile] if is_open else []
+
+        self.add_entrance(run, step)
+
+    def add_entrance(self, run: list[int], step: int):
+        if not run:
+            return
+
+        for tile in (run[0], run[-1]) if len(run) >= self.WIDE_ENTRANCE else (run[len(run)//2],):
+            for node in (tile, tile+step):
+                if node not in self.edges:
+                    self.edges[node] = {}
+                    self.cluster_nodes.setdefault(self.clusters[node], []).append(node)
+            self.edges[tile][tile+step] = 1
+            self.edges[tile+step][tile] = 1
+
+    def cluster_search(self, source: int) -> tuple[dict[int, int], dict[int, int]]:
+        '''
+        breadth first search that stays inside the cluster of source,
+        returns the distances and the parents of the reached tiles
+        '''
+        clusters, neighbours = self.clusters, self.grid.walkable_neighbours
+        cluster = clusters[source]
+        distances, parents = {source: 0}, {source: -1}
+        frontier = deque([source])
+        while frontier:
+            index = frontier.popleft()
+            for neighbour in neighbours[index]:
+                if neighbour not in distances and clusters[neighbour] == cluster:
+                    distances[neighbour] = distances[index] + 1
+                    parents[neighbour] = index
+                    frontier.append(neighbour)
+
+        return distances, parents
+
+    def find_path(self, start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+        '''
+        close to the shortest path but not always exactly it,
+        start and end are hooked into the graph for the one search
+        '''
+        if not self.grid.is_walkable(end):
+            return []
+
+        start_index, end_index = self.grid.index(start), self.grid.index(end)
+        start_distances, start_tree = self.cluster_search(start_index)
+        end_distances, end_tree = self.cluster_search(end_index)
+
+        start_edges = {node: start_distances[node] for node in self.cluster_nodes.get(self.clusters[start_index], [])
+                       if node in start_distances}
+        if end_index in start_distances:
+            start_edges[end_index] = start_distances[end_index]
+        end_edges = {node: end_distances[node] for node in self.cluster_nodes.get(self.clusters[end_index], [])
+                     if node in end_distances}
+
+        def hops(node):
+            yield from self.edges.get(node, {}).items()
+            if node == start_index:
+                yield from start_edges.items()
+            if node in end_edges:
+                yield end_index, end_edges[node]
+
+        route = self.search(start_index, end_index, hops)
+        if not route:
+            return []
+
+        path = [start_index]
+        for node, next_node in zip(route, route[1:]):
+            if self.clusters[node] != self.clusters[next_node]:
+                path.append(next_node)
+            elif node == start_index:
+                path.extend(self.trace(start_tree, next_node)[1:])
+            elif next_node == end_index:
+                path.extend(self.trace(end_tree, node)[::-1][1:])
+            else:
+                path.extend(self.trace(self.trees[node], next_node)[1:])
+
+        return [self.grid.position(index) for index in path]
+
+    def search(self, start: int, end: int, hops: Callable) -> list[int]:
+        width, end_x, end_y = self.grid.width, end % self.grid.width, end // self.grid.width
+        costs, parents, closed = {start: 0}, {start: -1}, set()
+        open_list = [(0, start)]
+        while open_list:
+            node = heappop(open_list)[1]
+            if node in closed:
+                continue
+            closed.add(node)
+
+            if node == end:
+                route = [end]
+                while parents[route[-1]] != -1:
+                    route.append(parents[route[-1]])
+                return route[::-1]
+
+            for next_node, cost in hops(node):
+                cost += costs[node]
+                if next_node in closed or costs.get(next_node, INFINITY) <= cost:
+                    continue
+                costs[next_node] = cost
+                parents[next_node] = node
+                heappush(open_list, (cost + abs(next_node % width - end_x) + abs(next_node // width - end_y), next_node))
+
+        return []
+
+    def trace(self, parents: dict[int, int], index: int) -> list[int]:
+        '''
+        path from the root of a search tree to index
+        '''
+        path = [index]
+        while parents[path[-1]] != -1:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+
+class DistanceField:
+    '''
+    breadth first step counts to a target tile, only
+    tiles up to max_distance steps away are reached
+    '''
+    def __init__(self, grid: Grid, target: tuple[int, int], max_distance: int):
+        self.grid = grid
+        self.target = target
+        self.max_distance = max_distance
+        self.distances: dict[int, int] = {}
+        if grid.is_walkable(target):
+            self.fill()
+
+    def fill(self):
+        target_index = self.grid.index(self.target)
+        self.distances[target_index] = 0
+        frontier = deque([target_index])
+        while frontier:
+            index = frontier.popleft()
+            distance = self.distances[index] + 1
+            if distance > self.max_distance:
+                continue
+
+            for neighbour in self.grid.neighbours(index):
+                if neighbour not in self.distances:
+                    self.distances[neighbour] = distance
+                    frontier.append(neighbour)
+
+    def distance_at(self, pos: tuple[int, int]) -> int | None:
+        return self.distances.get(self.grid.index(pos)) if self.grid.is_walkable(pos) else None
+
+    def path_from(self, pos: tuple[int, int]) -> list[tuple[int, int]] | None:
+        '''
+        steps downhill from pos to the target, pos itself is not
+        part of the path. None if pos is outside of the field
+        '''
+        distance = self.distance_at(pos)
+        if distance is None:
+            return None
+
+        index, path = self.grid.index(pos), []
+        while distance > 0:
+            distance -= 1
+            index = next(n for n in self.grid.neighbours(index) if self.distances.get(n) == distance)
+            path.append(self.grid.position(index))
+
+        return path
+
+
+class DStarLite:
+    '''
+    D* Lite search rooted at anchor. The tile it plans for is
+    the moving start of the search, so when it moves only the
+    part of the search that is out of date gets repaired
+    instead of searching from scratch again
+    '''
+    def __init__(self, grid: Grid, anchor: tuple[int, int]):
+        self.grid = grid
+        self.anchor = anchor
+        self.anchor_index = grid.index(anchor)
+        self.start: int = None
+        self.key_modifier = 0
+        self.g: dict[int, int] = {}
+        self.rhs: dict[int, int] = {grid.index(anchor): 0}
+        self.open_list = []
+
+    def heuristic(self, index1: int, index2: int) -> int:
+        width = self.grid.width
+        return abs(index1 % width - index2 % width) + abs(index1 // width - index2 // width)
+
+    def calculate_key(self, index: int) -> tuple[int, int]:
+        cost = min(self.g.get(index, INFINITY), self.rhs.get(index, INFINITY))
+        return cost + self.heuristic(self.start, index) + self.key_modifier, cost
+
+    def update_vertex(self, index: int):
+        g, rhs = self.g, self.rhs
+        if index != self.anchor_index:
+            rhs[index] = min([g.get(n, INFINITY) for n in self.grid.walkable_neighbours[index]], default=INFINITY) + 1
+        if g.get(index, INFINITY) != rhs.get(index, INFINITY):
+            heappush(self.open_list, (self.calculate_key(index), index))
+
+    def compute_shortest_path(self):
+        g, rhs, open_list, neighbours = self.g, self.rhs, self.open_list, self.grid.walkable_neighbours
+        start = self.start
+        while open_list:
+            start_cost = min(g.get(start, INFINITY), rhs.get(start, INFINITY))
+            if open_list[0][0] >= (start_cost + self.key_modifier, start_cost) \
+                    and rhs.get(start, INFINITY) == g.get(start, INFINITY):
+                break
+
+            old_key, index = heappop(open_list)
+            cost = g.get(index, INFINITY)
+            if cost == rhs.get(index, INFINITY):
+                continue
+
+            new_key = self.calculate_key(index)
+            if old_key < new_key:
+                heappush(open_list, (new_key, index))
+            elif cost > rhs[index]:
+                cost = g[index] = rhs[index]
+                # the cost only went down so neighbours can't get worse, no need to rescan theirs
+                for neighbour in neighbours[index]:
+                    if cost+1 < rhs.get(neighbour, INFINITY):
+                        rhs[neighbour] = cost+1
+                        if g.get(neighbour, INFINITY) != cost+1:
+                            heappush(open_list, (self.calculate_key(neighbour), neighbour))
+            else:
+                g[index] = INFINITY
+                self.update_vertex(index)
+                for neighbour in neighbours[index]:
+                    self.update_vertex(neighbour)
+
+    def path_to(self, target: tuple[int, int], pos: tuple[int, int]) -> list[tuple[int, int]] | None:
+        '''
+        shortest path from pos to target, pos itself is not part of
+        the path. None when pos has left the search tree, it then
+        needs a new DStarLite anchored on it
+        '''
+        if not self.grid.is_walkable(target):
+            return []
+
+        start = self.grid.index(target)
+        if self.start is None:
+            self.start = start
+            self.update_vertex(self.anchor_index)
+        else:
+            self.key_modifier += self.heuristic(self.start, start)
+            self.start = start
+        self.compute_shortest_path()
+
+        cost = self.g.get(start, INFINITY)
+        if cost == INFINITY:
+            return []
+
+        # pos can only be on the way if the search reached it and it's far enough from the anchor
+        goal, g, neighbours = self.grid.index(pos), self.g, self.grid.walkable_neighbours
+        if cost - g.get(goal, INFINITY) < self.heuristic(start, goal):
+            return None
+
+        index, trail = start, [start]
+        while index != goal:
+            if index == self.anchor_index:
+                return None
+
+            cost -= 1
+            steps = [n for n in neighbours[index] if g.get(n) == cost]
+            index = steps[0] if len(steps) == 1 else min(steps, key=lambda n: self.heuristic(n, goal))
+            trail.append(index)
+
+        return [self.grid.position(index) for index in reversed(trail[:-1])]
 
 
 class Pathfinder:
-    def __init__(self, map: Any):
+    # manhattan distance past which approximate searches go over the cluster graph
+    LONG_PATH = 3 * ClusterGraph.CLUSTER_SIZE
+
+    def __init__(self, map: Any, finder: AStarFinder | JumpPointFinder = None):
         self.grid = self.convertMapToGrid(map)
-        self.finder = AStarFinder()
-    
+        self.finder = finder if finder is not None else AStarFinder()
+        self.cluster_graph: ClusterGraph = None
+        self.distance_field: DistanceField = None
+
+    def prepare(self):
+        '''
+        builds the finder tables up front instead of on the first
+        search. The cluster graph is left to find_path_approx, nothing
+        in the game searches far enough to need it
+        '''
+        if isinstance(self.finder, JumpPointFinder):
+            self.finder.prepare(self.grid)
+
     def find_path(self, start: tuple, end: tuple) -> list[tuple[int, int]]:
-        start = self.grid.node(start[0], start[1])
-        end = self.grid.node(end[0], end[1])
-        path, runs = self.finder.find_path(start, end, self.grid)
-        path = [(n.x, n.y) for n in path]
-        return path
-        
+        '''
+        a shortest path, start and end included
+        '''
+        return self.finder.find_path(start, end, self.grid)
+
+    def find_path_approx(self, start: tuple, end: tuple) -> list[tuple[int, int]]:
+        '''
+        for searches across the map that don't need the shortest path,
+        long ones go over the cluster graph and can come out a few
+        percent longer (up to about a third in bad cases)
+        '''
+        if abs(start[0]-end[0]) + abs(start[1]-end[1]) > self.LONG_PATH:
+            return self.get_cluster_graph().find_path(start, end)
+        return self.find_path(start, end)
+
+    def get_cluster_graph(self) -> ClusterGraph:
+        if self.cluster_graph is None:
+            self.cluster_graph = ClusterGraph(self.grid)
+        return self.cluster_graph
+
+    def create_planner(self, anchor: tuple[int, int]) -> DStarLite:
+        return DStarLite(self.grid, anchor)
+
+    def get_distance_field(self, target: tuple[int, int], max_distance: int) -> DistanceField:
+        '''
+        the field is only rebuilt when the target moves so every
+        mob chasing the same target in a turn shares it
+        '''
+        field = self.distance_field
+        if field is None or field.target != target or field.max_distance != max_distance:
+            self.distance_field = DistanceField(self.grid, target, max_distance)
+        return self.distance_field
 
     def convertMapToGrid(self, map: Any) -> Grid:
-        new_map = []
-        for row in map.getMapArray():
-            new_row = []
-            for col in row:
-                if col in [2, 3]:
-                    col = 1
-                new_row.append(col)
-            new_map.append(new_row)
-
-        return Grid(matrix=new_map)
+        tiles = map.getMapArray()
+        return Grid(tiles.walkable().tobytes(), tiles.width, tiles.height)
@@ -0,0 +1,42 @@
+from functools import lru_cache
+import pygame as pg
+
+from settings import TILESIZE
+
+TILEMAP_ELEVATION = './assets/Ground/Tilemap_Elevation.png'
+
+
+@lru_cache(maxsize=None)
+def load_image(path: str) -> pg.Surface:
+    '''
+    loads and converts each image file once,
+    every caller shares the same surface
+    '''
+    try:
+        return pg.image.load(path).convert_alpha()
+    except pg.error as e:
+        raise FileNotFoundError(e)
+
+@lru_cache(maxsize=None)
+def get_tile(sheet_path: str, x: int, y: int, tint: tuple[int, int, int] = None, scale: tuple[int, int] = None, tile_size=TILESIZE) -> pg.Surface:
+    '''
+    returns the shared, ready to blit surface of a tile,
+    callers must not draw onto it
+    '''
+    rect = pg.Rect(x*tile_size, y*tile_size, tile_size, tile_size)
+    tile = load_image(sheet_path).subsurface(rect)
+    if tint is not None:
+        tile = tint_surface(tile.copy(), tint)
+    if scale is not None:
+        tile = pg.transform.scale(tile, scale)
+
+    return tile
+
+def tint_surface(surface: pg.Surface, color) -> pg.Surface:
+    """Apply a tint to the surface in place (light brown for example)."""
+    tint = pg.Surface(surface.get_size())
+    tint.fill(color + (0,))  # Add transparency value (0 = fully opaque)
+    
+    # Blend the tint with the original image using alpha blending
+    surface.blit(tint, (0, 0), special_flags=pg.BLEND_RGBA_MULT)
+    return surface
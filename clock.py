@@ -0,0 +1,23 @@
+from settings import FPS
+
+
+class SimulationClock:
+    '''
+    stands in for pg.time.Clock in a headless game, tick never
+    waits and moves a simulated time on by one frame instead,
+    so timers and animations still run out, just without the
+    real time between the frames
+    '''
+    def __init__(self, frame_ms: int = 1000 // FPS):
+        self.frame_ms = frame_ms
+        self.ticks = 0
+
+    def tick(self, framerate=0) -> int:
+        self.ticks += self.frame_ms
+        return self.frame_ms
+
+    def get_ticks(self) -> int:
+        return self.ticks
+
+    def get_fps(self) -> float:
+        return 1000 / self.frame_ms
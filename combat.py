@@ -0,0 +1,68 @@
+'''
+attack resolution between combatants, anything with a name,
+an attributes dict, a status_effects list and receive_damage
+will do. Nothing in here needs pygame so fights can be
+simulated without sprites
+'''
+from Dice import Die
+from tickers import StatusEffect
+
+
+def absorb_damage(attributes: dict, damage: int) -> int:
+    '''
+    takes damage through armour, resistance and temporary
+    health, returns how much of it got through to health
+    '''
+    damage = max(0, damage - attributes['armour'])
+    if not damage:
+        return 0
+
+    if attributes['resistance']:
+        damage //= 2
+
+    attributes['temporary_health'] -= damage
+    if attributes['temporary_health'] >= 0:
+        return 0
+
+    damage = attributes['temporary_health']*-1
+    attributes['temporary_health'] = 0
+
+    attributes['health'] -= damage
+    return damage
+
+
+def deal_damage(attacker, target, is_crit: bool) -> dict[str, int]:
+    # temp: split into each dice for better reporting
+    roll = attacker.attributes['damage_dice'].roll(is_crit)
+    damage = roll + attacker.attributes['damage']
+    target_recieved_damage = target.receive_damage(damage)
+    self_received_damage = attacker.receive_damage(target.attributes['biteback'])
+
+    return {'dealt': {'damage_roll': roll, 'damage_bonus': attacker.attributes['damage'], 'total_received': target_recieved_damage}, 'received': self_received_damage}
+
+
+def make_attack(attacker, target) -> dict[str, any]:
+    roll = Die(20).roll()
+    is_crit = roll >= attacker.attributes['crit_range']
+    is_hit = roll+attacker.attributes['attack'] >= target.attributes['defence']
+    damage_roll_info = {'dealt': {'damage_roll': 0, 'damage_bonus': 0, 'total_received': 0}, 'received': 0}
+    if is_hit:
+        damage_roll_info = deal_damage(attacker, target, is_crit)
+
+    return {'is_hit': is_hit, 'is_crit': is_crit, 'roll': roll, 'attack_bonus': attacker.attributes['attack'], 'damage': damage_roll_info}
+
+
+def attack_action(attacker, target) -> dict[str, any]:
+    '''
+    attack_number attacks, reports the last one
+    '''
+    for _ in range(attacker.attributes['attack_number']):
+        results = make_attack(attacker, target)
+
+    return results
+
+
+def defend_action(defender) -> dict:
+    status_effect = StatusEffect("Defence", [('defence', 10)], 1)
+    defender.status_effects.append(status_effect)
+    return status_effect.apply_effect(defender)
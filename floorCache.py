@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+import numpy as np
+from proceduralGeneration import ProceduralGenerationType, Room
+from tileGrid import TileGrid
+
+
+class FloorCache:
+    '''
+    Content addressed on-disk store of generated tile data,
+    files are named after a hash of the generator, map size,
+    seed and the generator's parameters so changing any of
+    them never serves a stale floor
+    '''
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get_key(self, map_generator_type: ProceduralGenerationType, map_size: tuple[int, int], seed: int) -> str:
+        generator = map_generator_type.value
+        parameters = {name: value for name, value in vars(generator).items() if name.isupper()}
+        description = json.dumps([generator.__name__, list(map_size), seed, parameters], sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def create_map(self, map_generator_type: ProceduralGenerationType, map_size: tuple[int, int], seed: int) -> tuple[TileGrid, list[Room] | None]:
+        '''
+        loads the floor if it was generated before,
+        otherwise generates and stores it
+        '''
+        path = os.path.join(self.directory, self.get_key(map_generator_type, map_size, seed) + '.npz')
+        if os.path.exists(path):
+            return self.load(path)
+
+        map, rooms = map_generator_type.value.create_map(*map_size, seed)
+        self.store(path, map, rooms)
+        return map, rooms
+
+    def load(self, path: str) -> tuple[TileGrid, list[Room] | None]:
+        with np.load(path) as data:
+            rooms = [Room(*room) for room in data['rooms'].tolist()] if data['has_rooms'] else None
+            return TileGrid.from_array(data['tiles']), rooms
+
+    def store(self, path: str, map: TileGrid, rooms: list[Room] | None):
+        os.makedirs(self.directory, exist_ok=True)
+        room_array = np.array([(room.x, room.y, room.width, room.height) for room in rooms or []], dtype=np.int64).reshape(-1, 4)
+
+        # write next to the target and swap it in so a concurrent reader never sees half a file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, tiles=map.tiles, rooms=room_array, has_rooms=rooms is not None)
+        os.replace(temp_path, path)
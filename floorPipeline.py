@@ -0,0 +1,56 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import random
+from floorCache import FloorCache
+from map import Map
+from proceduralGeneration import ProceduralGenerationType
+
+
+def generate_floor(map_size: tuple[int, int], num_of_mobs: int, seed: int, floor_cache: FloorCache = None) -> Map:
+    map_type = random.Random(seed).choice(list(ProceduralGenerationType))
+    map = Map(map_size, map_generator_type=map_type, seed=seed, floor_cache=floor_cache)
+    map.plan_floor(num_of_mobs)
+    return map
+
+
+class FloorPipeline:
+    '''
+    Generates the next floor in a worker process while
+    the current one is being played, so entering a new
+    level only has to bind the sprites.
+    With a run seed every floor seed is derived from it,
+    so the whole sequence of floors can be replayed
+    '''
+    def __init__(self, map_size: tuple[int, int], num_of_mobs: int, seed: int = None, floor_cache: FloorCache = None):
+        self.map_size = map_size
+        self.num_of_mobs = num_of_mobs
+        self.seed = seed
+        self.floor_cache = floor_cache
+        self.floors_generated = 0
+        # a fresh interpreter rather than a fork of the game, which already runs SDL threads,
+        # it imports the entry script again so that keeps its game imports under __main__
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        self.next_floor: Future | None = None
+
+    def get_next_seed(self) -> int:
+        self.floors_generated += 1
+        if self.seed is None:
+            return random.getrandbits(32)
+
+        return random.Random(f'{self.seed}:{self.floors_generated}').getrandbits(32)
+
+    def take_floor(self) -> Map:
+        '''
+        returns the pre-generated floor (only waiting for it if it's
+        not done yet) and starts generating the one after it
+        '''
+        if self.next_floor is None:
+            floor = generate_floor(self.map_size, self.num_of_mobs, self.get_next_seed(), self.floor_cache)
+        else:
+            floor = self.next_floor.result()
+
+        self.next_floor = self.executor.submit(generate_floor, self.map_size, self.num_of_mobs, self.get_next_seed(), self.floor_cache)
+        return floor
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
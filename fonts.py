@@ -0,0 +1,28 @@
+from functools import lru_cache
+import pygame as pg
+
+
+@lru_cache(maxsize=None)
+def get_font(name: str | None, size: int) -> pg.font.Font:
+    '''
+    one Font per file and size, None is pygame's default font
+    '''
+    return pg.font.Font(name, size)
+
+
+@lru_cache(maxsize=512)
+def render_text(text: str, size: int, color: tuple, antialias: bool = True, font_name: str | None = None) -> pg.Surface:
+    '''
+    rendered labels are shared between frames and states,
+    copy the surface before changing it (set_alpha and the like)
+    '''
+    return get_font(font_name, size).render(text, antialias, color)
+
+
+@lru_cache(maxsize=4096)
+def text_width(font: pg.font.Font, text: str) -> int:
+    '''
+    width of text in pixels, per font, wrapping measures
+    the same few words over and over
+    '''
+    return font.size(text)[0]
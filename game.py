@@ -0,0 +1,136 @@
+import os
+import pygame as pg
+import random
+from typing import Callable
+from clock import SimulationClock
+from Dice import Die
+from floorCache import FloorCache
+from floorPipeline import FloorPipeline
+from gameStates import CombatState, HubState, LevelUpState, State, WorldMapState
+from settings import FLOOR_CACHE_DIR, HEIGHT, SEED, TITLE, WIDTH
+from sprites import Creature
+
+
+class Game:
+    def __init__(self, headless: bool = False, input_source=None, seed: int = SEED):
+        '''
+        a headless game has no window, no audio and no frame pacing,
+        its states are driven by input_source (see inputSources.py)
+        as fast as they can run
+        '''
+        self.headless = headless
+        self.input_source = input_source
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+        pg.init()
+        if not headless:
+            pg.mixer.init()  # Initialize the mixer
+        self.screen = pg.display.set_mode((WIDTH, HEIGHT))
+        pg.display.set_caption(TITLE)
+        self.clock = SimulationClock() if headless else pg.time.Clock()
+        pg.key.set_repeat(100, 100)
+        self.current_floor = 1
+        # picks waiting on top of the current state, see get_active_state
+        self.level_up_selections: list[LevelUpState] = []
+
+        self.init_music()
+
+        # only seeded runs can hit the cache again, random ones would just fill the disk
+        floor_cache = FloorCache(FLOOR_CACHE_DIR) if seed is not None else None
+        self.floor_pipeline = FloorPipeline((64, 48), num_of_mobs=1, seed=seed, floor_cache=floor_cache)#(3+(self.current_floor-1)*3)
+        self.map_state = WorldMapState(self, self.clock, self.screen, self.floor_pipeline.take_floor())
+        self.hub_state = HubState(self, self.clock, self.screen)
+
+        self.player = self.map_state.player
+        self.current_state = self.map_state
+
+        # Start with WorldMap music
+        self.play_music("world_map")
+
+    def init_music(self):
+        relative_path = './assets/Music/'
+        self.music_tracks = {
+            "world_map": relative_path+"world_map_music.mp3",
+            "combat": relative_path+"combat_music.mp3",
+            "hub": relative_path+"hub_music.mp3",
+        }
+
+        self.current_track = None  # Currently loaded track
+    
+    def play_music(self, track_name):
+        if self.headless:
+            return
+
+        pg.mixer.music.stop()
+
+        track_path = self.music_tracks[track_name]
+        if self.current_track != track_path:
+            pg.mixer.music.load(track_path)
+            self.current_track = track_path
+
+        random_start = random.uniform(0, 3600)
+        pg.mixer.music.play(-1)
+        pg.mixer.music.set_volume(0.1)
+        pg.mixer.music.set_pos(random_start)
+
+    def get_ticks(self) -> int:
+        '''
+        ms since the game started, simulated time when headless
+        '''
+        if self.headless:
+            return self.clock.get_ticks()
+        return pg.time.get_ticks()
+
+    def get_active_state(self) -> State:
+        '''
+        a pending level up selection runs before the current state
+        '''
+        return self.level_up_selections[0] if self.level_up_selections else self.current_state
+
+    def run(self):
+        '''
+        transitions only swap current_state, the running state
+        then returns here and the next one takes over
+        '''
+        while True:
+            self.get_active_state().run()
+
+    def initiate_combat(self, mob: Creature, player_first: bool):
+        self.play_music("combat")  # Switch to combat music
+        self.current_state = CombatState(self, self.clock, self.screen, mob, player_first)
+
+    def enter_world_map(self):
+        self.play_music("world_map")  # Switch to WorldMap music
+        self.current_state = self.map_state
+
+    def enter_new_level(self):
+        self.current_floor += 1
+        self.map_state = WorldMapState(self, self.clock, self.screen, self.floor_pipeline.take_floor())
+        # temp: arbitrary number
+        self.player.add_experience(600)
+        self.player.add_meta_currency(Die(20).roll())
+        self.enter_world_map()
+
+    def return_to_dungeon(self):
+        self.current_floor = 1
+        upgrades = self.hub_state.get_character_upgrades()
+        self.map_state = WorldMapState(self, self.clock, self.screen, self.floor_pipeline.take_floor())
+        self.player = self.map_state.player
+        self.player.apply_upgrades(upgrades)
+        self.enter_world_map()
+
+    def enter_level_up_selection(self, choices, on_choice: Callable):
+        '''
+        queues the selection, it takes over from whatever state is
+        running and hands the picked choice to on_choice
+        '''
+        self.level_up_selections.append(LevelUpState(self, self.clock, self.screen, choices, on_choice))
+
+    def enter_hub(self):
+        self.play_music("hub")  # Switch to Hub music
+        print('player has procured:', self.player.meta_currency, 'meta currency during this run!')
+        self.hub_state.store_meta_currency(self.player.meta_currency)
+        self.current_state = self.hub_state
+
@@ -1,32 +1,93 @@
 from math import ceil
-import random
 import sys
+from typing import Callable
 import pygame as pg
 
 from CombatLog import CombatLog
 from Dice import Die
+from fonts import render_text
 from LevelUp import Paladin
-from map import Map, Viewport
-from proceduralGeneration import ProceduralGenerationType, TileType
+from map import Map
+from proceduralGeneration import TileType
+from rendering import FloorSurface, Viewport, get_grid_overlay, get_marker
 from settings import BGCOLOR, BLACK, DARK_GRAY, FPS, GRAY, GREEN, HEIGHT, LIGHTGREY, RED, TILESIZE, WHITE, WIDTH, YELLOW
+from spatialIndex import TileIndex
 
-from sprites import CombatSkeleton, MapExit, MobType, Player, Skeleton, Creature, Wall
+from sprites import CombatSkeleton, MapExit, MobType, Player, Skeleton, Creature
 
 class State:
+    # ms, a waiting state still wakes up this often without any input
+    IDLE_TIMEOUT = 250
+
     def __init__(self, game, clock, screen):
         self.game = game
         self.clock = clock
         self.screen = screen
     
+    def run(self):
+        '''
+        runs frames until a transition makes another state the current
+        one, the game loop then runs that state
+        '''
+        while self.is_active():
+            self.step()
+
+    def step(self):
+        '''
+        a single frame, a headless game skips drawing it
+        '''
+        self.dt = self.clock.tick(FPS) / 1000
+        self.events()
+        if not self.is_active():
+            return
+        self.update()
+        if self.is_active() and not self.game.headless:
+            self.draw()
+
+    def is_active(self) -> bool:
+        return self.game.get_active_state() is self
+
+    def is_animating(self) -> bool:
+        '''
+        whether the state needs frames without any input,
+        states that only react to input override this
+        '''
+        return True
+
+    def poll_events(self) -> list[pg.event.Event]:
+        '''
+        pending events, a state that isn't animating blocks
+        until an event comes in instead of spinning at full FPS.
+        A game driven by an input source takes its events from it
+        '''
+        if self.game.input_source is not None:
+            return self.game.input_source.get_events(self)
+
+        if self.is_animating():
+            return pg.event.get()
+
+        event = pg.event.wait(self.IDLE_TIMEOUT)
+        events = [] if event.type == pg.NOEVENT else [event]
+        events.extend(pg.event.get())
+        # the wait shouldn't end up in the next frame's dt
+        self.clock.tick()
+        return events
+
     def quit(self):
+        self.game.floor_pipeline.shutdown()
         pg.quit()
         sys.exit()
      
 
 class LevelUpState(State):
-    def __init__(self, game, clock, screen, choices):
+    '''
+    shows on top of the current state until a card is picked,
+    the pick goes to on_choice
+    '''
+    def __init__(self, game, clock, screen, choices, on_choice: Callable):
         super().__init__(game, clock, screen)
         self.choices = choices
+        self.on_choice = on_choice
         self.selected_idx = None
 
         self.card_width, self.card_height = 200, 300
@@ -34,14 +95,15 @@ class LevelUpState(State):
         self.x_start = (WIDTH - ((self.card_width + self.gap) * len(self.choices) - self.gap)) // 2
         self.y_start = 150
 
-    def run(self):
-        while True:
-            choice = self.events()
-            if choice:
-                return choice
-            
-            self.draw()
-            # self.clock.tick(FPS)
+    def is_animating(self) -> bool:
+        return False
+
+    def choose(self, choice):
+        self.game.level_up_selections.remove(self)
+        self.on_choice(choice)
+
+    def update(self):
+        pass
 
     def draw(self):
         self.screen.fill(GRAY)
@@ -55,18 +117,16 @@ class LevelUpState(State):
             pg.draw.rect(self.screen, BLACK, (x, y, self.card_width, self.card_height), 2)
 
             # Render text
-            font = pg.font.Font(None, 24)
-            text_surface = font.render(choice.name, True, BLACK)
+            text_surface = render_text(choice.name, 24, BLACK)
             text_rect = text_surface.get_rect(center=(x + self.card_width // 2, y + self.card_height // 2))
             self.screen.blit(text_surface, text_rect)
 
         pg.display.flip()
 
     def events(self):
-        for event in pg.event.get():
+        for event in self.poll_events():
             if event.type == pg.QUIT:
-                pg.quit()
-                sys.exit()
+                self.quit()
             elif event.type == pg.MOUSEMOTION:
                 mouse_x, mouse_y = event.pos
                 self.selected_idx = None
@@ -83,13 +143,14 @@ class LevelUpState(State):
 
             elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
                 if self.selected_idx is not None:
-                    return self.choices[self.selected_idx]
+                    self.choose(self.choices[self.selected_idx])
+                    return
 
 class WorldMapState(State):
-    def __init__(self, game, clock, screen):
+    def __init__(self, game, clock, screen, map: Map):
         super().__init__(game, clock, screen)
 
-        self.map = []
+        self.map = map
         self.player_turn = True
         self.mobs = []  
 
@@ -97,42 +158,45 @@ class WorldMapState(State):
 
     def new(self, game):
         self.all_sprites = pg.sprite.Group()
-        self.background_layer = pg.sprite.Group()
-        self.interactable_layer = pg.sprite.Group()
-        self.player_layer = pg.sprite.Group()
-        self.mob_layer = pg.sprite.Group()
-        self.collision_group = pg.sprite.Group()
-
-        map_type = random.choice(list(ProceduralGenerationType))
-        self.map = Map(self.collision_group, self.background_layer,
-                       (64, 48), map_generator_type=map_type)
+        self.interactable_layer = TileIndex()
+        self.player_layer = TileIndex()
+        self.mob_layer = TileIndex()
+
+        # only drawing uses it, a headless game never draws
+        self.floor_surface = FloorSurface(self.map.map) if not self.game.headless else None
         
-        player_pos_x, player_pos_y = self.map.get_initial_player_pos()
+        player_pos_x, player_pos_y = self.map.player_start
         self.player = Player(self.game, (self.all_sprites, self.player_layer), 
-                             (self.collision_group, self.mob_layer), 
+                             (self.mob_layer, ), 
                              player_pos_x, player_pos_y,
-                             Paladin())
+                             Paladin(), self.map)
         self.player.assign_combat_sprite()
         
-        self.map.assign_map_exit((player_pos_x, player_pos_y))
-        tile_map = pg.image.load("./assets/Ground/Tilemap_Elevation.png").convert_alpha()
-        MapExit(game, (self.all_sprites, self.interactable_layer), tile_map, self.map.exit[0], self.map.exit[1])
+        MapExit(game, (self.all_sprites, self.interactable_layer), self.map.exit[0], self.map.exit[1])
         
-        mob_positions = self.map.get_mob_positions(1)#(3+(self.game.current_floor-1)*3)
-        self.mobs = [Skeleton(game, self.map, self.player, self.all_sprites, self.mob_layer, x, y) for x, y in mob_positions]
+        self.mobs = [Skeleton(game, self.map, self.player, self.all_sprites, self.mob_layer, x, y) for x, y in self.map.mob_positions]
         
         self.viewport = Viewport(self.map.tile_width, self.map.tile_height)
+        # what the screen showed after the last draw, see draw
+        self.drawn_offset = None
+        self.drawn_sprites = {}
+        self.drawn_markers = set()
   
+    def invalidate(self):
+        '''
+        something else drew over the screen, the next draw starts from scratch
+        '''
+        self.drawn_offset = None
+
     def run(self):
-        while True:
-            self.dt = self.clock.tick(FPS) / 1000
-            self.events()
-            self.update()
-            self.draw()
+        self.invalidate()
+        super().run()
     
     def enemies_act(self):
         for mob in self.mob_layer:
             mob.act()
+            if not self.is_active():
+                return
     
     def update(self):
         self.all_sprites.update()
@@ -144,50 +208,102 @@ class WorldMapState(State):
         self.viewport.update(self.player)            
     
     def draw(self):
+        '''
+        the map only changes when something moves, so only the
+        screen areas that changed since the last draw are redrawn
+        and pushed to the display. A scrolled viewport moves
+        everything and redraws the whole screen
+        '''
         # pg.display.set_caption("{:.2f}".format(self.clock.get_fps()))
+        offset = self.viewport.viewport.topleft
+        sprites = self.get_drawn_sprites()
+        markers = set(self.get_path_marker_rects())
+
+        if offset != self.drawn_offset:
+            self.draw_layers()
+            pg.display.flip()
+        else:
+            dirty_rects = self.get_dirty_rects(sprites, markers)
+            if not dirty_rects:
+                return
+
+            self.screen.set_clip(dirty_rects[0].unionall(dirty_rects))
+            self.draw_layers()
+            self.screen.set_clip(None)
+            pg.display.update(dirty_rects)
+
+        self.drawn_offset = offset
+        self.drawn_sprites = sprites
+        self.drawn_markers = markers
+
+    def get_dirty_rects(self, sprites: dict, markers: set) -> list[pg.Rect]:
+        '''
+        where a sprite was and where it is now for every sprite
+        that moved, changed image, appeared or disappeared
+        '''
+        dirty_rects = []
+        for sprite in sprites.keys() | self.drawn_sprites.keys():
+            now, before = sprites.get(sprite), self.drawn_sprites.get(sprite)
+            if now != before:
+                dirty_rects.extend(rect for _, rect in filter(None, (now, before)))
+
+        dirty_rects.extend(pg.Rect(marker) for marker in markers ^ self.drawn_markers)
+        return dirty_rects
+
+    def draw_layers(self):
         self.screen.fill(BGCOLOR)
         self.draw_grid()
-        self.draw_background_sprites()
+        self.draw_background()
         self.draw_interactable_sprites()
         self.draw_action_sprites()
         self.draw_mob_paths()
-        pg.display.flip()
 
-    def draw_mob_paths(self):
+    def get_drawn_sprites(self) -> dict[pg.sprite.Sprite, tuple[pg.Surface, pg.Rect]]:
+        visible_tiles = self.viewport.visible_tiles()
+        return {sprite: (sprite.image, self.viewport.apply_offset(sprite.rect))
+                for layer in (self.interactable_layer, self.player_layer, self.mob_layer)
+                for sprite in layer.in_rect(visible_tiles)}
+
+    def get_path_marker_rects(self) -> list[tuple[int, int, int, int]]:
+        rects = []
         for mob in self.mobs:
             for x, y in mob.path:
-                rect = pg.Rect(x, y, TILESIZE//4, TILESIZE//4)
-                image = pg.Surface((TILESIZE//4, TILESIZE//4))
-                image.fill(YELLOW)
-                rec = image.get_rect(center=rect.center)
-                rec.x = rec.x*TILESIZE + 3*TILESIZE//8
-                rec.y = rec.y*TILESIZE + 3*TILESIZE//8
-                self.screen.blit(image, self.viewport.apply_offset(rec))
-
-    def draw_background_sprites(self):
-        for sprite in self.background_layer:
-            self.screen.blit(sprite.image, self.viewport.apply_offset(sprite.rect))
+                rect = pg.Rect(x*TILESIZE + 3*TILESIZE//8, y*TILESIZE + 3*TILESIZE//8, TILESIZE//4, TILESIZE//4)
+                rects.append(tuple(self.viewport.apply_offset(rect)))
+        return rects
+
+    def draw_mob_paths(self):
+        marker = get_marker(TILESIZE//4, YELLOW)
+        self.screen.blits([(marker, rect) for rect in self.get_path_marker_rects()], doreturn=False)
+
+    def draw_background(self):
+        self.floor_surface.draw(self.screen, self.viewport)
     
     def draw_interactable_sprites(self):
-        for sprite in self.interactable_layer:
+        for sprite in self.interactable_layer.in_rect(self.viewport.visible_tiles()):
             self.screen.blit(sprite.image, self.viewport.apply_offset(sprite.rect))
     
     def draw_action_sprites(self):
-        for sprite in self.player_layer:
+        visible_tiles = self.viewport.visible_tiles()
+        for sprite in self.player_layer.in_rect(visible_tiles):
             self.screen.blit(sprite.image, self.viewport.apply_offset(sprite.rect))
         
-        for sprite in self.mob_layer:
+        for sprite in self.mob_layer.in_rect(visible_tiles):
             self.screen.blit(sprite.image, self.viewport.apply_offset(sprite.rect))
 
     def draw_grid(self):
-        for vertical_line_pos in range(0, WIDTH, TILESIZE):
-            pg.draw.line(self.screen, LIGHTGREY, (vertical_line_pos, 0), (vertical_line_pos, HEIGHT))
-        for horizontal_line_pos in range(0, HEIGHT, TILESIZE):
-            pg.draw.line(self.screen, LIGHTGREY, (0, horizontal_line_pos), (WIDTH, horizontal_line_pos))
+        self.screen.blit(get_grid_overlay(self.screen.get_size(), LIGHTGREY), (0, 0))
      
+    def is_animating(self) -> bool:
+        # turns resolve within a frame, nothing on the map moves on its own
+        return False
+
     def events(self):
-        e = pg.event.get()
+        e = self.poll_events()
         for event in e:
+            if not self.is_active():
+                return
+
             if event.type == pg.QUIT:
                 self.quit()
 
@@ -214,7 +330,7 @@ class WorldMapState(State):
 class CombatState(State):
     def __init__(self, game, clock, screen, map_mob: Creature, player_first: bool):
         super().__init__(game, clock, screen)
-        self.font = pg.font.Font(None, 36)
+        self.font_size = 36
 
         self.combat_log = CombatLog(
             screen=self.screen,
@@ -273,21 +389,23 @@ class CombatState(State):
 
             self.generate_mob(mob_type, mob_pos.center)    
 
-    def run(self):
-        while True:
-            self.dt = self.clock.tick(FPS) / 1000
-            self.events()
-            self.update()
-            self.draw()
-    
+    def is_animating(self) -> bool:
+        # enemy turns bob one after another and the end screen runs on a timer
+        return not self.player_turn or self.current_enemy_turn is not None or self.end_screen_timer is not None
+
     ### events
     def events(self):
+        # after waiting, the mouse may have moved
+        events = self.poll_events()
         mouse_pos = pg.mouse.get_pos()
 
         self.update_action_hover(mouse_pos)
         self.update_target_hover(mouse_pos)
             
-        for event in pg.event.get():
+        for event in events:
+            if not self.is_active():
+                return
+
             if event.type == pg.QUIT:
                 self.quit()
 
@@ -302,13 +420,13 @@ class CombatState(State):
                 self.update_selected_action(event.pos)
                 
                 if self.selected_action == "Attack":
-                    self.execute_attack(mouse_pos)
+                    self.execute_attack(event.pos)
 
                 elif self.selected_action == "Defend":
                     self.execute_defend()
 
                 elif self.selected_action == "Skill":
-                    self.execute_skill(mouse_pos)
+                    self.execute_skill(event.pos)
 
                 elif self.selected_action == "Escape":
                     self.execute_escape()
@@ -463,13 +581,13 @@ class CombatState(State):
         for action in self.actions:
             color = (180, 180, 250) if action["hovered"] or action["name"] == self.selected_action else GRAY
             pg.draw.rect(self.screen, color, action["rect"])
-            text = self.font.render(action["name"], True, BLACK)
+            text = render_text(action["name"], self.font_size, BLACK)
             self.screen.blit(text, (action["rect"].x + 10, action["rect"].y + 5))
     
     def draw_taget_box(self):
         ### drawing target box
         pg.draw.rect(self.screen, GRAY, self.target_selection_box, 2)
-        target_text = self.font.render("Targets", True, WHITE)
+        target_text = render_text("Targets", self.font_size, WHITE)
         self.screen.blit(target_text, (self.target_selection_box.x + 10, self.target_selection_box.y - 30))
 
     def draw_targets(self):
@@ -489,7 +607,7 @@ class CombatState(State):
                 else:
                     text_color = WHITE
 
-                text = self.font.render(enemy.name, True, text_color)
+                text = render_text(enemy.name, self.font_size, text_color)
                 self.screen.blit(text, (self.target_selection_box.x + 10, self.target_selection_box.y + 10 + idx * 40))
 
         elif self.selected_action in [None, "Defence"]:
@@ -503,7 +621,7 @@ class CombatState(State):
             pg.draw.rect(self.screen, (100, 100, 150), player_box)  # Blue-gray color for player box
 
             # Draw player's health inside the box
-            health_text = self.font.render(f"Player Health: {self.player.attributes['health']}/{self.player.attributes['max_health']}", True, WHITE)
+            health_text = render_text(f"Player Health: {self.player.attributes['health']}/{self.player.attributes['max_health']}", self.font_size, WHITE)
             health_text_rect = health_text.get_rect(center=player_box.center)
             self.screen.blit(health_text, health_text_rect)
 
@@ -526,7 +644,7 @@ class CombatState(State):
                 else:
                     text_color = WHITE
                     
-                skill_text = self.font.render(f'{skill.name} {f"({skill.timer})" if skill.is_ticking() else ""}', True, text_color)
+                skill_text = render_text(f'{skill.name} {f"({skill.timer})" if skill.is_ticking() else ""}', self.font_size, text_color)
                 self.screen.blit(skill_text, (self.target_selection_box.x + 10, self.target_selection_box.y + 10 + idx * 40))
 
     def draw_status_effect_boxes(self):
@@ -550,7 +668,7 @@ class CombatState(State):
 
                 # Render the text for the status effect
                 effect_text = f"{status.name} ({status.timer})"
-                text_surface = pg.font.Font(None, 18).render(effect_text, True, (255, 255, 255))
+                text_surface = render_text(effect_text, 18, (255, 255, 255))
 
                 # Draw the text centered in the box
                 text_rect = text_surface.get_rect(center=(effect_left + effect_width // 2, effect_top + effect_height // 2))
@@ -565,11 +683,11 @@ class CombatState(State):
             draw_effects(mob)
 
     def draw_defeat_message(self):
-        text = pg.font.Font(None, 70).render('Defeat...', True, (255, 87, 51))
+        text = render_text('Defeat...', 70, (255, 87, 51))
         self.screen.blit(text, (WIDTH//2, HEIGHT//2))
         
     def draw_victory_message(self):
-        text = pg.font.Font(None, 70).render('Victory!', True, (255, 223, 0))
+        text = render_text('Victory!', 70, (255, 223, 0))
         self.screen.blit(text, (WIDTH//3+text.get_rect().width//2, HEIGHT//4))
     
     ###
@@ -596,14 +714,18 @@ class CombatState(State):
             if not is_bobbing:
                 self.current_enemy_turn = None
 
+    def end_screen_is_over(self) -> bool:
+        # nobody watches the end screen of a headless game
+        return self.game.headless or self.game.get_ticks() - self.end_screen_timer > 2000
+
     def check_if_combat_ended(self):
         if len(self.mobs_group) == 0:
             self.map_mob.kill()
 
             if self.end_screen_timer is None:
-                self.end_screen_timer = pg.time.get_ticks()
+                self.end_screen_timer = self.game.get_ticks()
 
-            elif pg.time.get_ticks() - self.end_screen_timer > 2000:
+            if self.end_screen_is_over():
                 self.player.add_experience(self.encounter_experience)
                 self.game.player.add_meta_currency(Die(10).roll())
                 self.exit_combat(False)
@@ -611,9 +733,9 @@ class CombatState(State):
 
         elif not self.player.is_alive:
             if self.end_screen_timer is None:
-                self.end_screen_timer = pg.time.get_ticks()
+                self.end_screen_timer = self.game.get_ticks()
 
-            elif pg.time.get_ticks() - self.end_screen_timer > 2000:
+            if self.end_screen_is_over():
                 self.player.die()
                 self.game.player.die()
                 self.exit_combat(True)
@@ -663,7 +785,7 @@ class HubState(State):
         self.player_upgrade_cost = 10
         self.currency = 0
 
-        self.font = pg.font.Font(None, 36)
+        self.font_size = 36
         self.hub_areas = {
             "Base Upgrades":        {"rect": pg.Rect(100, 100, 200, 50), "hovered": False},
             "Blacksmith":           {"rect": pg.Rect(100, 150, 200, 50), "hovered": False},
@@ -712,14 +834,12 @@ class HubState(State):
             upgrades.extend([(upgrade_name.lower().replace(' ', '_'), upgrade['level']) for upgrade_name, upgrade in upgrade_list.items() if upgrade['level']])
         return upgrades
     
-    def run(self):
-        while True:
-            self.dt = self.clock.tick(FPS) / 1000
-            self.events()
-            self.update()
-            self.draw()
+    def is_animating(self) -> bool:
+        return self.insufficient_funds_alpha > 0
 
     def events(self):
+        # after waiting, the mouse may have moved
+        events = self.poll_events()
         mouse_pos = pg.mouse.get_pos()
 
         # hover effects
@@ -732,7 +852,10 @@ class HubState(State):
 
         self.return_button_hovered = self.return_button.collidepoint(mouse_pos)
 
-        for event in pg.event.get():
+        for event in events:
+            if not self.is_active():
+                return
+
             if event.type == pg.QUIT:
                 self.quit()
 
@@ -805,7 +928,7 @@ class HubState(State):
             for area_name, area in self.hub_areas.items():
                 color = GREEN if area["hovered"] else GRAY
                 pg.draw.rect(self.screen, color, area["rect"])
-                text = self.font.render(area_name, True, BLACK)
+                text = render_text(area_name, self.font_size, BLACK)
                 self.screen.blit(text, (area["rect"].x + 10, area["rect"].y + 10))
         else:
             self.draw_upgrade_menu()
@@ -814,7 +937,7 @@ class HubState(State):
         pg.display.flip()
 
     def draw_currency_display(self):
-        currency_text = self.font.render(f"Meta Currency: {self.currency}", True, WHITE)
+        currency_text = render_text(f"Meta Currency: {self.currency}", self.font_size, WHITE)
         self.screen.blit(currency_text, (20, 20))
 
     def draw_upgrade_menu(self):
@@ -823,7 +946,7 @@ class HubState(State):
 
             if self.current_area_name != 'Base Upgrades' and upgrade['level'] >= self.base_upgrades[self.current_area_name]['level']:
                 color = DARK_GRAY  # Locked state
-                locked_text = self.font.render("Base level too low", True, RED)
+                locked_text = render_text("Base level too low", self.font_size, RED)
                 self.screen.blit(locked_text, (upgrade_rect.x, upgrade_rect.y - 20))
             else:
                 color = (180, 180, 250) if upgrade["hovered"] else GRAY
@@ -832,10 +955,10 @@ class HubState(State):
             pg.draw.rect(self.screen, BLACK, upgrade_rect, 2)
 
             # Render upgrade text
-            name_text = self.font.render(upgrade_name, True, BLACK)
-            level_text = self.font.render(f"Level: {upgrade['level']}", True, BLACK)
+            name_text = render_text(upgrade_name, self.font_size, BLACK)
+            level_text = render_text(f"Level: {upgrade['level']}", self.font_size, BLACK)
             cost = upgrade['level'] * 20 if self.current_area == self.base_upgrades else self.player_upgrade_cost
-            cost_text = self.font.render(f"Cost: {cost}", True, BLACK)
+            cost_text = render_text(f"Cost: {cost}", self.font_size, BLACK)
 
             self.screen.blit(name_text, (upgrade_rect.x + 10, upgrade_rect.y + 10))
             self.screen.blit(level_text, (upgrade_rect.x + 10, upgrade_rect.y + 40))
@@ -844,12 +967,12 @@ class HubState(State):
         # Draw Return button
         color = (180, 180, 250) if self.return_button_hovered else GRAY
         pg.draw.rect(self.screen, color, self.return_button)
-        return_text = self.font.render("Return", True, BLACK)
+        return_text = render_text("Return", self.font_size, BLACK)
         self.screen.blit(return_text, (self.return_button.x + 50, self.return_button.y + 10))
 
     def draw_insufficient_funds_message(self):
         if self.insufficient_funds_alpha > 0:
-            message_surface = self.font.render(self.insufficient_funds_message, True, (255, 0, 0))
+            message_surface = render_text(self.insufficient_funds_message, self.font_size, (255, 0, 0)).copy()
             message_surface.set_alpha(int(self.insufficient_funds_alpha))
             self.screen.blit(message_surface, (self.screen.get_width() // 2 - message_surface.get_width() // 2, 50))
 
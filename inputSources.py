@@ -0,0 +1,98 @@
+from collections.abc import Iterable
+import pygame as pg
+
+from gameStates import CombatState, HubState, LevelUpState, WorldMapState
+
+
+class ScriptedInput:
+    '''
+    input source replaying a fixed script, one list of
+    events per frame, once it runs out frames get no events
+    '''
+    def __init__(self, frames: Iterable[list[pg.event.Event]]):
+        self.frames = iter(frames)
+
+    def get_events(self, state) -> list[pg.event.Event]:
+        return next(self.frames, [])
+
+
+class BotInput:
+    '''
+    input source that plays on its own: walks to the exit
+    fighting whatever is in the way with plain attacks,
+    takes the first level up choice and goes straight back
+    to the dungeon from the hub
+    '''
+    def __init__(self):
+        self.turns = 0
+        self.combats = 0
+        self.deaths = 0
+        self.path = []
+        self.combat = None
+
+    def get_events(self, state) -> list[pg.event.Event]:
+        if isinstance(state, WorldMapState):
+            return self.map_events(state)
+        if isinstance(state, CombatState):
+            return self.combat_events(state)
+        if isinstance(state, LevelUpState):
+            return self.level_up_events(state)
+        if isinstance(state, HubState):
+            return self.hub_events(state)
+        return []
+
+    def map_events(self, state: WorldMapState) -> list[pg.event.Event]:
+        position = state.player.get_position()
+        if not self.path or self.path[0] != position:
+            # the way to the exit crosses the map, it doesn't have to be the shortest one
+            self.path = state.map.get_pathfinder().find_path_approx(position, state.map.exit)
+
+        self.turns += 1
+        if len(self.path) < 2:
+            # standing on the exit, or it can't be reached so just wait
+            key = pg.K_e if position == state.map.exit else pg.K_SPACE
+            return [key_press(key)]
+
+        self.path.pop(0)
+        next_x, next_y = self.path[0]
+        dx, dy = next_x - position[0], next_y - position[1]
+        if dx:
+            key = pg.K_RIGHT if dx > 0 else pg.K_LEFT
+        else:
+            key = pg.K_DOWN if dy > 0 else pg.K_UP
+        return [key_press(key)]
+
+    def combat_events(self, state: CombatState) -> list[pg.event.Event]:
+        if state is not self.combat:
+            self.combat = state
+            self.combats += 1
+        if not state.player_turn or not state.player.is_alive or state.end_screen_timer is not None:
+            return []
+
+        enemy = next(iter(state.mobs_group), None)
+        if enemy is None:
+            return []
+
+        self.turns += 1
+        attack = next(action for action in state.actions if action["name"] == "Attack")
+        return [click(attack["rect"].center), click(enemy.rect.center)]
+
+    def level_up_events(self, state: LevelUpState) -> list[pg.event.Event]:
+        card_centre = (state.x_start + state.card_width // 2, state.y_start + state.card_height // 2)
+        return [pg.event.Event(pg.MOUSEMOTION, pos=card_centre, rel=(0, 0), buttons=(0, 0, 0)), click(card_centre)]
+
+    def hub_events(self, state: HubState) -> list[pg.event.Event]:
+        if state.current_area is not None:
+            return [click(state.return_button.center)]
+
+        self.deaths += 1
+        self.path = []
+        return [click(state.hub_areas["Return to Dungeon"]["rect"].center)]
+
+
+def key_press(key: int) -> pg.event.Event:
+    return pg.event.Event(pg.KEYDOWN, key=key, mod=0, unicode='', scancode=0)
+
+
+def click(pos: tuple[int, int]) -> pg.event.Event:
+    return pg.event.Event(pg.MOUSEBUTTONDOWN, pos=pos, button=1)
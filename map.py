@@ -1,43 +1,63 @@
 import random
-from pygame import Rect, sprite
-from settings import HEIGHT, WIDTH
-from proceduralGeneration import ProceduralGenerationType, TileType, Room
-from Pathfinding import Pathfinder
+import numpy as np
+from floorCache import FloorCache
+from Pathfinding import AStarFinder, JumpPointFinder, Pathfinder
+from proceduralGeneration import ProceduralGenerationType, Room
+from tileGrid import RegionLabels, TileGrid, TileType
 
 
 class Map:
-    def __init__(self, collision_group: sprite.Group, background_group: sprite.Group, map_size: tuple[int, int], map_generator_type: ProceduralGenerationType):
+    def __init__(self, map_size: tuple[int, int], map_generator_type: ProceduralGenerationType, seed: int = None, floor_cache: FloorCache = None):
         self.tile_width, self.tile_height = map_size
-        self.collision_group = collision_group
-        self.background_group = background_group
         self.rooms = []
-        self.map = []
+        self.map: TileGrid = ...
+        self.regions: RegionLabels = ...
+        self.map_generator_type = map_generator_type
         self.generator = map_generator_type.value
+        self.seed = seed
+        # everything placed on the map is drawn from the seed as well so a seeded floor replays exactly
+        self.rng = random.Random(seed)
+        self.floor_cache = floor_cache
+        self.pathfinder: Pathfinder = None
         self.generate_map()
         self.exit = ...
+        self.player_start = ...
+        self.mob_positions = []
 
     def generate_map(self):
-        self.map, self.rooms = self.generator.create_map(self.tile_width, self.tile_height, self.collision_group, self.background_group)
+        if self.floor_cache is not None and self.seed is not None:
+            self.map, self.rooms = self.floor_cache.create_map(self.map_generator_type, (self.tile_width, self.tile_height), self.seed)
+        else:
+            self.map, self.rooms = self.generator.create_map(self.tile_width, self.tile_height, self.seed)
+        self.regions = self.map.label_regions()
+
+    def plan_floor(self, num_of_mobs: int):
+        '''
+        picks the player start, the exit and the mob spawn points and
+        builds the pathfinding tables, none of it touches pygame so
+        it can run in a worker process
+        '''
+        self.player_start = self.get_initial_player_pos()
+        self.assign_map_exit(self.player_start)
+        self.mob_positions = self.get_mob_positions(num_of_mobs)
+        self.get_pathfinder().prepare()
 
     def assign_map_exit(self, player_pos: tuple[int, int]):
         potential_exit = self._get_random_floor()
-        p = Pathfinder(self)
-        while not p.find_path(player_pos, potential_exit):
+        while not self.regions.are_connected(player_pos, potential_exit):
             potential_exit = self._get_random_floor()
 
         self.exit = potential_exit
 
     
     def check_if_pos_is_floor(self, pos: tuple[int, int]) -> bool:
-        x, y = pos
-        return self.map[y][x] == TileType.Floor
+        return self.map.is_floor(pos)
     
     def _get_random_floor(self) -> tuple[int, int]:
-            y = random.randint(0, self.tile_height-1)
-            row = self.map[y]
-            available_tiles = [(x, y) for x, tile in enumerate(row) if tile == TileType.Floor]
+            y = self.rng.randint(0, self.tile_height-1)
+            available_tiles = np.flatnonzero(self.map.row(y) == TileType.Floor)
 
-            return random.choice(available_tiles) if len(available_tiles)>0 else self._get_random_floor()
+            return (int(self.rng.choice(available_tiles)), y) if len(available_tiles)>0 else self._get_random_floor()
 
     def get_initial_player_pos(self) -> tuple[int, int]:
         return self._get_random_floor()
@@ -45,22 +65,17 @@ class Map:
     def get_mob_positions(self, num_of_positions) -> list[tuple[int, int]]:
         return [self._get_random_floor() for _ in range(num_of_positions)]
 
-    def getMapArray(self) -> list[list[TileType]]:
+    def getMapArray(self) -> TileGrid:
         return self.map
 
-class Viewport:
-    def __init__(self, tile_width: int, tile_height: int):
-        self.viewport = Rect(0, 0, tile_width, tile_height)
-        self.tile_width = tile_width
-        self.tile_height = tile_height
-    
-    def apply_offset(self, entity_rect: Rect) -> Rect:
-        # watch ep 4 for limiting camera
-        # didnt implement it as we dont want 
-        # player to know where the map ends anyways
-        return entity_rect.move(self.viewport.topleft)
-    
-    def update(self, target: sprite.Sprite):
-        new_x = -target.rect.x + WIDTH//2
-        new_y = -target.rect.y + HEIGHT//2
-        self.viewport.update(new_x, new_y, self.tile_width, self.tile_height)
\ No newline at end of file
+    def get_pathfinder(self) -> Pathfinder:
+        '''
+        one pathfinder per floor, every mob searches
+        the same walkability grid
+        '''
+        if self.pathfinder is None:
+            # jump points pay off along bsp rooms and corridors, on caves nearly
+            # every tile is one so plain A* is quicker there
+            is_cave = self.map_generator_type != ProceduralGenerationType.BSP
+            self.pathfinder = Pathfinder(self, AStarFinder() if is_cave else JumpPointFinder())
+        return self.pathfinder
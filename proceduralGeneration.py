@@ -1,21 +1,11 @@
 
-import copy
-from enum import Enum, IntEnum
+from enum import Enum
 from itertools import tee
 import random
 from typing import Iterable
-from pygame.sprite import Group
-from pygame import image
+import numpy as np
 
-from sprites import Floor, Wall
-
-
-class TileType(IntEnum):
-    Wall = 0
-    Floor = 1
-    Player = 2
-    Mob = 3
-    Map_Exit = 4
+from tileGrid import TileGrid, TileType
 
 
 class Room:
@@ -28,8 +18,8 @@ class Room:
     def __repr__(self):
         return f'Room({self.x}, {self.y}, {self.width}, {self.height})'
 
-    def get_random_tile(self):
-        return random.randint(self.x, self.x+self.width-1), random.randint(self.y, self.y+self.height-1)
+    def get_random_tile(self, rng: random.Random = random):
+        return rng.randint(self.x, self.x+self.width-1), rng.randint(self.y, self.y+self.height-1)
     
     def set_x(self, x):
         self.x = x
@@ -42,13 +32,15 @@ class Room:
 
 
 class BinarySpacePartition:
-    def _make_room(tile_width: int, tile_height: int, min_splits: int, max_splits: int) -> Room:
+    NUM_OF_ROOMS = 10
+
+    def _make_room(tile_width: int, tile_height: int, min_splits: int, max_splits: int, rng: random.Random) -> Room:
         #-1 so they dont spawn in outside walls
         room = Room(1, 1, tile_width-1, tile_height-1)
-        NUM_OF_SPLITS = random.randint(min_splits, max_splits)
+        NUM_OF_SPLITS = rng.randint(min_splits, max_splits)
         is_vertical_split = True
         for _ in range(NUM_OF_SPLITS):
-            take_second_split = bool(random.getrandbits(1))
+            take_second_split = bool(rng.getrandbits(1))
             is_vertical_split = not is_vertical_split
             
             if is_vertical_split:
@@ -63,124 +55,113 @@ class BinarySpacePartition:
 
         return room
     
-    def _add_room_to_map(map: list[list[TileType]], room: Room):
-        for row in range(room.y, room.y+room.height):
-            for col in range(room.x, room.x+room.width):
-                map[row][col] = TileType.Floor
+    def _add_room_to_map(map: TileGrid, room: Room):
+        map.fill_rect(room.x, room.y, room.width, room.height, TileType.Floor)
     
-    def _make_corridor(map: list[list[TileType]], start: tuple[int, int], finish: tuple[int, int], is_vertical: bool):
+    def _make_corridor(map: TileGrid, start: tuple[int, int], finish: tuple[int, int], is_vertical: bool):
         y0, y1 = sorted((start[1], finish[1]))
         x0, x1 = sorted((start[0], finish[0]))
 
         if is_vertical:
-            for y_id in range(y0, y1+1):
-                map[y_id][start[0]] = TileType.Floor
-
-            for x_id in range(x0, x1+1):
-                map[finish[1]][x_id] = TileType.Floor
+            map.column(start[0])[y0:y1+1] = TileType.Floor
+            map.row(finish[1])[x0:x1+1] = TileType.Floor
         else:
-            for x_id in range(x0, x1+1):
-                map[finish[1]][x_id] = TileType.Floor
-
-            for y_id in range(y0, y1+1):
-                map[y_id][start[0]] = TileType.Floor
+            map.row(finish[1])[x0:x1+1] = TileType.Floor
+            map.column(start[0])[y0:y1+1] = TileType.Floor
     
-    def _add_corridors_to_map(map: list[list[TileType]], rooms: Iterable[Room]):
+    def _add_corridors_to_map(map: TileGrid, rooms: Iterable[Room], rng: random.Random):
         for room, room2 in _pairwise(rooms):
-            start, finish = room.get_random_tile(), room2.get_random_tile()
-            BinarySpacePartition._make_corridor(map, start, finish, is_vertical=bool(random.getrandbits(1)))
+            start, finish = room.get_random_tile(rng), room2.get_random_tile(rng)
+            BinarySpacePartition._make_corridor(map, start, finish, is_vertical=bool(rng.getrandbits(1)))
     
-    def create_map(tile_width: int, tile_height: int, collision_group: Group, background_group: Group):
+    def create_map(tile_width: int, tile_height: int, seed: int = None) -> tuple[TileGrid, list[Room] | None]:
         '''
         orderly rooms, dijkstra map to find 
         'essential rooms' and force exploration
         for the sake of progression
         '''
-        map = [[TileType.Wall for _ in range(tile_width)] for _ in range(tile_height)]
+        rng = random.Random(seed)
+        map = TileGrid(tile_width, tile_height)
         rooms = []
-        NUM_OF_ROOMS = 10
-        for i in range(NUM_OF_ROOMS):
+        for i in range(BinarySpacePartition.NUM_OF_ROOMS):
             min_splits, max_splits = (3, 5) if i<2 else (5, 6) if i<7 else (4, 8)
-            room = BinarySpacePartition._make_room(tile_width, tile_height, min_splits, max_splits)
+            room = BinarySpacePartition._make_room(tile_width, tile_height, min_splits, max_splits, rng)
             BinarySpacePartition._add_room_to_map(map, room)
             rooms.append(room)
         
-        _encase_map(map, tile_width, tile_height)
-        BinarySpacePartition._add_corridors_to_map(map, rooms)
-        _create_walls_floors(map, collision_group, background_group)
+        map.encase()
+        BinarySpacePartition._add_corridors_to_map(map, rooms, rng)
 
         return map, rooms
 
 
 class CellularAutomata:
-    def count_neighbouring_walls(x:int, y:int, width: int, height: int, temp_grid: list[list[TileType]]) -> int:
-        count = 0
-        for x_coord in range(x-1, x+2):
-            for y_coord in range(y-1, y+2):
-                if _is_within_map_bounds(x_coord, y_coord, width, height):
-                    if x_coord != x or y_coord != y:
-                        if temp_grid[y_coord][x_coord] == TileType.Wall:
-                            count+=1
-                else:
-                    count+=1
-        
-        return count
-        
-    def generate_noise_grid(tile_width:int, tile_height: int, noise_density: int) -> list[list[TileType]]:
+    NOISE_DENSITY = 50
+    ITERATIONS = 2
+
+    def generate_noise_grid(tile_width:int, tile_height: int, noise_density: int, rng: random.Random) -> TileGrid:
         '''
         noise_density: int
             percentage of walls in the map
         '''
-        return [
-            [TileType.Floor if random.randint(0, 100) > noise_density else TileType.Wall for _ in range(tile_width)]
-            for _ in range(tile_height)
-        ]
+        noise = np.random.default_rng(rng.getrandbits(64)).integers(0, 101, size=(tile_height, tile_width))
+        return TileGrid.from_array(np.where(noise > noise_density, TileType.Floor, TileType.Wall))
     
-    def run_cellular_automata(grid: list[list[TileType]], iterations: int) -> list[list[TileType]]:
-        width = len(grid[0])
-        height = len(grid)
+    def run_cellular_automata(grid: TileGrid, iterations: int) -> TileGrid:
+        '''
+        smooths the grid in place: a tile becomes a wall when more than
+        4 of its 8 neighbours are walls, out of bounds tiles count as walls
+        '''
+        walls = grid.tiles == TileType.Wall
+        height, width = walls.shape
+
+        # front buffer holds the current generation padded with a ring of walls,
+        # back buffer accumulates the neighbour counts of the next one
+        padded = np.ones((height+2, width+2), dtype=np.uint8)
+        counts = np.empty((height, width), dtype=np.uint8)
+        padded[1:-1, 1:-1] = walls
 
         for _ in range(iterations):
-            temp_grid = copy.deepcopy(grid)
+            counts.fill(0)
+            for dy in range(3):
+                for dx in range(3):
+                    if dx != 1 or dy != 1:
+                        np.add(counts, padded[dy:dy+height, dx:dx+width], out=counts)
 
-            for y in range(height):
-                for x in range(width):
-                    neighbouring_wall_count = CellularAutomata.count_neighbouring_walls(x, y, width, height, temp_grid)
-                    grid[y][x] = TileType.Wall if neighbouring_wall_count>4 else TileType.Floor
-            
+            np.greater(counts, 4, out=padded[1:-1, 1:-1])
 
+        grid.tiles[...] = np.where(padded[1:-1, 1:-1], TileType.Wall, TileType.Floor)
         return grid
     
-    def generate_map(tile_width, tile_height):
-        noise_grid = CellularAutomata.generate_noise_grid(tile_width, tile_height, noise_density=50)
-        map = CellularAutomata.run_cellular_automata(noise_grid, iterations=2)
+    def generate_map(tile_width, tile_height, rng: random.Random):
+        noise_grid = CellularAutomata.generate_noise_grid(tile_width, tile_height, CellularAutomata.NOISE_DENSITY, rng)
+        map = CellularAutomata.run_cellular_automata(noise_grid, CellularAutomata.ITERATIONS)
         return _remove_unreachable_areas(map)
     
-    def create_map(tile_width: int, tile_height: int, collision_group: Group, background_group: Group):
-        map = CellularAutomata.generate_map(tile_width, tile_height)
+    def create_map(tile_width: int, tile_height: int, seed: int = None) -> tuple[TileGrid, list[Room] | None]:
+        rng = random.Random(seed)
+        map = CellularAutomata.generate_map(tile_width, tile_height, rng)
 
         if not CellularAutomata._map_is_all_walls(map):
-            map = CellularAutomata.generate_map(tile_width, tile_height)
+            map = CellularAutomata.generate_map(tile_width, tile_height, rng)
 
-        _encase_map(map, tile_width, tile_height)
-        _create_walls_floors(map, collision_group, background_group)
+        map.encase()
         
         return map, None
     
-    def _map_is_all_walls(map: list[list[TileType]]):
-        flattened = sum(map, [])
-        return all([tile==TileType.Wall for tile in flattened])
+    def _map_is_all_walls(map: TileGrid):
+        return map.count(TileType.Wall) == map.tiles.size
     
 
 class DrunkenStumble:
-    def _initialise_map(tile_width: int, tile_height: int):
-        return [
-            [TileType.Wall for _ in range(tile_width)]
-            for _ in range(tile_height)
-        ] 
+    HULK_NUMBER = 10
+    STEPS_PER_HULK = 1500
+
+    def _initialise_map(tile_width: int, tile_height: int) -> TileGrid:
+        return TileGrid(tile_width, tile_height)
     
-    def _move_randomly(x, y):
-        p = random.randint(1, 4)
+    def _move_randomly(x, y, rng: random.Random):
+        p = rng.randint(1, 4)
         if p == 1:
             y+=1
         elif p == 2:
@@ -192,26 +173,24 @@ class DrunkenStumble:
 
         return x, y
 
-    def _set_hulks_loose(map: list[list[TileType]], hulk_number: int, steps_per_hulk: int) -> list[list[TileType]]:
-        x, y = random.randint(0, len(map[0])-1), random.randint(0, len(map)-1)
+    def _set_hulks_loose(map: TileGrid, hulk_number: int, steps_per_hulk: int, rng: random.Random) -> TileGrid:
+        x, y = rng.randint(0, map.width-1), rng.randint(0, map.height-1)
         map[y][x] = TileType.Floor
         for _ in range(hulk_number):
-            x, y = _get_random_floor(map)
+            x, y = _get_random_floor(map, rng)
             for _ in range(steps_per_hulk):
-                x, y = DrunkenStumble._move_randomly(x, y)
-                if _is_within_map_bounds(x, y, len(map[0])-1, len(map)-1):
+                x, y = DrunkenStumble._move_randomly(x, y, rng)
+                if _is_within_map_bounds(x, y, map.width-1, map.height-1):
                     map[y][x] = TileType.Floor
 
         return map
 
-    def create_map(tile_width: int, tile_height: int, collision_group: Group, background_group: Group):
+    def create_map(tile_width: int, tile_height: int, seed: int = None) -> tuple[TileGrid, list[Room] | None]:
+        rng = random.Random(seed)
         map = DrunkenStumble._initialise_map(tile_width, tile_height)
-        hulk_number = 10
-        steps_per_hulk = 1500
-        map = DrunkenStumble._set_hulks_loose(map, hulk_number, steps_per_hulk)
+        map = DrunkenStumble._set_hulks_loose(map, DrunkenStumble.HULK_NUMBER, DrunkenStumble.STEPS_PER_HULK, rng)
         map = _remove_unreachable_areas(map)
-        _encase_map(map, tile_width, tile_height)
-        _create_walls_floors(map, collision_group, background_group)
+        map.encase()
 
         return map, None
         
@@ -227,39 +206,11 @@ class ProceduralGenerationType(Enum):
     DS = DrunkenStumble
 
 
-def _remove_unreachable_areas(map: list[list[TileType]]) -> list[list[TileType]]:
-    def is_within_bounds(x, y):
-        return 0 <= x < len(map[0]) and 0 <= y < len(map)
-
-    def flood_fill(x, y, visited):
-        stack = [(x, y)]
-        region = []
-        while stack:
-            cx, cy = stack.pop()
-            if (cx, cy) in visited:
-                continue
-            visited.add((cx, cy))
-            region.append((cx, cy))
-            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:  # Cardinal directions
-                nx, ny = cx + dx, cy + dy
-                if is_within_bounds(nx, ny) and map[ny][nx] == TileType.Floor and (nx, ny) not in visited:
-                    stack.append((nx, ny))
-        return region
-
-    visited = set()
-    regions = []
-    for y in range(len(map)):
-        for x in range(len(map[0])):
-            if map[y][x] == TileType.Floor and (x, y) not in visited:
-                region = flood_fill(x, y, visited)
-                regions.append(region)
-
-    if regions:
-        largest_region = max(regions, key=len)
-        for region in regions:
-            if region != largest_region:
-                for x, y in region:
-                    map[y][x] = TileType.Wall
+def _remove_unreachable_areas(map: TileGrid) -> TileGrid:
+    regions = map.label_regions()
+    if len(regions):
+        unreachable = (regions.labels != 0) & (regions.labels != regions.largest())
+        map.tiles[unreachable] = TileType.Wall
 
     return map
 
@@ -268,14 +219,14 @@ def _pairwise(iterable: Iterable) -> Iterable:
     next(b, None)
     return zip(a, b)
 
-def _get_random_floor(map):
-    row_idx = random.randint(0, len(map)-1)
-    row = map[row_idx]
-    if any([tile==TileType.Floor for tile in row]):
-        col_idx = random.choice([(idx, tile) for idx, tile in enumerate(row) if tile==TileType.Floor])[0]
+def _get_random_floor(map: TileGrid, rng: random.Random):
+    row_idx = rng.randint(0, map.height-1)
+    floor_cols = np.flatnonzero(map.row(row_idx) == TileType.Floor)
+    if len(floor_cols):
+        col_idx = int(rng.choice(floor_cols))
         return col_idx, row_idx
     else:
-        return _get_random_floor(map)
+        return _get_random_floor(map, rng)
 
 def _is_within_map_bounds(x, y, width, height):
         if x < 0 or x >= width:
@@ -284,18 +235,3 @@ def _is_within_map_bounds(x, y, width, height):
             return False
         
         return True
-    
-def _create_walls_floors(map: list[list[TileType]], collision_group: Group, background_group: Group):
-    tile_map = image.load("./assets/Ground/Tilemap_Elevation.png").convert_alpha()
-    for y, row in enumerate(map):
-        for x, tile in enumerate(row):
-            if tile == TileType.Wall:
-                Wall((collision_group, background_group), tile_map, x, y)
-            elif tile == TileType.Floor:
-                Floor((background_group), tile_map, x, y)
-    
-def _encase_map(map: list[list[TileType]], tile_width: int, tile_height: int):
-    for x in range(tile_width):
-        for y in range(tile_height):
-            if x in (0, tile_width-1) or y in (0, tile_height-1):
-                map[y][x] = TileType.Wall
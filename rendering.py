@@ -0,0 +1,95 @@
+from functools import lru_cache
+from math import ceil
+import pygame as pg
+
+from assets import TILEMAP_ELEVATION, get_tile
+from settings import HEIGHT, TILESIZE, WIDTH
+from tileGrid import TileGrid, TileType
+
+
+class FloorSurface:
+    '''
+    The static tiles of a floor baked once into chunk surfaces,
+    drawing the background is then a few blits of the chunks
+    that overlap the screen instead of one blit per tile
+    '''
+    CHUNK_PIXELS = 512
+
+    def __init__(self, map: TileGrid):
+        self.chunk_tiles = max(1, self.CHUNK_PIXELS // TILESIZE)
+        self.textures = {
+            TileType.Wall: get_tile(TILEMAP_ELEVATION, 1, 5),
+            TileType.Floor: get_tile(TILEMAP_ELEVATION, 1, 1, tint=(120, 105, 90)),
+        }
+        self.chunks = [self.bake_chunk(map, chunk_x, chunk_y)
+                       for chunk_y in range(ceil(map.height / self.chunk_tiles))
+                       for chunk_x in range(ceil(map.width / self.chunk_tiles))]
+
+    def bake_chunk(self, map: TileGrid, chunk_x: int, chunk_y: int) -> tuple[pg.Surface, pg.Rect]:
+        x0, y0 = chunk_x * self.chunk_tiles, chunk_y * self.chunk_tiles
+        tiles = map.tiles[y0:y0+self.chunk_tiles, x0:x0+self.chunk_tiles]
+        height, width = tiles.shape
+
+        surface = pg.Surface((width*TILESIZE, height*TILESIZE), flags=pg.SRCALPHA)
+        surface.blits([(self.textures[tile], (x*TILESIZE, y*TILESIZE))
+                       for y, row in enumerate(tiles.tolist())
+                       for x, tile in enumerate(row)
+                       if tile in self.textures], doreturn=False)
+
+        return surface, surface.get_rect(topleft=(x0*TILESIZE, y0*TILESIZE))
+
+    def draw(self, screen: pg.Surface, viewport):
+        screen_rect = screen.get_rect()
+        for surface, rect in self.chunks:
+            screen_pos = viewport.apply_offset(rect)
+            if screen_rect.colliderect(screen_pos):
+                screen.blit(surface, screen_pos)
+
+
+@lru_cache(maxsize=None)
+def get_grid_overlay(size: tuple[int, int], color: tuple[int, int, int], tile_size: int = TILESIZE) -> pg.Surface:
+    '''
+    tile grid lines drawn once per screen size onto
+    a transparent surface, blit it instead of the lines
+    '''
+    width, height = size
+    overlay = pg.Surface(size, flags=pg.SRCALPHA)
+    for vertical_line_pos in range(0, width, tile_size):
+        pg.draw.line(overlay, color, (vertical_line_pos, 0), (vertical_line_pos, height))
+    for horizontal_line_pos in range(0, height, tile_size):
+        pg.draw.line(overlay, color, (0, horizontal_line_pos), (width, horizontal_line_pos))
+    return overlay
+
+
+@lru_cache(maxsize=None)
+def get_marker(size: int, color: tuple[int, int, int]) -> pg.Surface:
+    marker = pg.Surface((size, size))
+    marker.fill(color)
+    return marker
+
+
+class Viewport:
+    def __init__(self, tile_width: int, tile_height: int):
+        self.viewport = pg.Rect(0, 0, tile_width, tile_height)
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+    
+    def apply_offset(self, entity_rect: pg.Rect) -> pg.Rect:
+        # watch ep 4 for limiting camera
+        # didnt implement it as we dont want 
+        # player to know where the map ends anyways
+        return entity_rect.move(self.viewport.topleft)
+    
+    def visible_tiles(self, margin: int = 1) -> pg.Rect:
+        '''
+        tiles that show on the screen, plus a margin for
+        sprites whose image is bigger than their tile
+        '''
+        left, top = -self.viewport.x // TILESIZE - margin, -self.viewport.y // TILESIZE - margin
+        right, bottom = (-self.viewport.x + WIDTH) // TILESIZE + margin + 1, (-self.viewport.y + HEIGHT) // TILESIZE + margin + 1
+        return pg.Rect(left, top, right-left, bottom-top)
+
+    def update(self, target: pg.sprite.Sprite):
+        new_x = -target.rect.x + WIDTH//2
+        new_y = -target.rect.y + HEIGHT//2
+        self.viewport.update(new_x, new_y, self.tile_width, self.tile_height)
@@ -19,4 +19,8 @@ BGCOLOR = DARKGREY
 
 TILESIZE = 8#64
 GRIDWIDTH = WIDTH / TILESIZE
-GRIDHEIGHT = HEIGHT / TILESIZE
\ No newline at end of file
+GRIDHEIGHT = HEIGHT / TILESIZE
+
+# map generation
+SEED = None # set to an int to replay the same sequence of floors
+FLOOR_CACHE_DIR = './.floor_cache'
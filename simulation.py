@@ -0,0 +1,36 @@
+import argparse
+import random
+import time
+
+
+def run_simulation(game, frames: int):
+    '''
+    steps whichever state is active for the given number of frames
+    '''
+    for _ in range(frames):
+        game.get_active_state().step()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='plays the game headless with a bot, as fast as it can')
+    parser.add_argument('--frames', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # imported here and not at the top, the spawned floor worker imports
+    # this script again and has no use for pygame or the game states
+    from game import Game
+    from inputSources import BotInput
+
+    bot = BotInput()
+    game = Game(headless=True, input_source=bot, seed=args.seed)
+    start = time.perf_counter()
+    run_simulation(game, args.frames)
+    elapsed = time.perf_counter() - start
+    game.floor_pipeline.shutdown()
+
+    print(f'{args.frames} frames, {bot.turns} turns in {elapsed:.2f}s ({bot.turns/elapsed:.0f} turns/s)')
+    print(f'floor {game.current_floor}, {bot.combats} combats, {bot.deaths} deaths, '
+          f'{game.clock.get_ticks()/1000:.0f}s of simulated time')
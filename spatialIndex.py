@@ -0,0 +1,64 @@
+import pygame as pg
+
+
+class TileIndex(pg.sprite.Group):
+    '''
+    sprite group that also keeps its sprites by the tile
+    they stand on, GameObject.place reports every move so
+    looking up what is on a tile doesn't scan the group.
+    Tiles are grouped into square buckets as well so the
+    sprites in an area are found without visiting every tile
+    '''
+    BUCKET_TILES = 16
+
+    def __init__(self, *sprites):
+        self.tiles: dict[tuple[int, int], list[pg.sprite.Sprite]] = {}
+        self.buckets: dict[tuple[int, int], set[pg.sprite.Sprite]] = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: pg.sprite.Sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self._insert(sprite, sprite.get_position())
+
+    def remove_internal(self, sprite: pg.sprite.Sprite):
+        super().remove_internal(sprite)
+        self._discard(sprite, sprite.get_position())
+
+    def move(self, sprite: pg.sprite.Sprite, old_pos: tuple[int, int]):
+        self._discard(sprite, old_pos)
+        self._insert(sprite, sprite.get_position())
+
+    def at(self, pos: tuple[int, int]) -> pg.sprite.Sprite | None:
+        sprites = self.tiles.get(pos)
+        return sprites[0] if sprites else None
+
+    def in_rect(self, tile_rect: pg.Rect) -> list[pg.sprite.Sprite]:
+        '''
+        sprites standing on a tile inside of tile_rect
+        '''
+        size = self.BUCKET_TILES
+        sprites = []
+        for bucket_y in range(tile_rect.top // size, (tile_rect.bottom-1) // size + 1):
+            for bucket_x in range(tile_rect.left // size, (tile_rect.right-1) // size + 1):
+                sprites.extend(sprite for sprite in self.buckets.get((bucket_x, bucket_y), ())
+                               if tile_rect.collidepoint(sprite.get_position()))
+        return sprites
+
+    def _bucket_of(self, pos: tuple[int, int]) -> tuple[int, int]:
+        return pos[0] // self.BUCKET_TILES, pos[1] // self.BUCKET_TILES
+
+    def _insert(self, sprite: pg.sprite.Sprite, pos: tuple[int, int]):
+        self.tiles.setdefault(pos, []).append(sprite)
+        self.buckets.setdefault(self._bucket_of(pos), set()).add(sprite)
+
+    def _discard(self, sprite: pg.sprite.Sprite, pos: tuple[int, int]):
+        sprites = self.tiles.get(pos)
+        if sprites and sprite in sprites:
+            sprites.remove(sprite)
+            if not sprites:
+                del self.tiles[pos]
+
+            bucket = self.buckets[self._bucket_of(pos)]
+            bucket.discard(sprite)
+            if not bucket:
+                del self.buckets[self._bucket_of(pos)]
@@ -5,17 +5,17 @@ import pygame as pg
 from enum import Enum
 
 from AI.BehaviourTree import BehaviourTree
+from assets import TILEMAP_ELEVATION, get_tile, load_image
+import combat
 from Dice import DiceGroup, Die
 from LevelUp import ClassTable, SkeletonClass
-from Pathfinding import Pathfinder
+from Pathfinding import DStarLite
 from settings import GREEN, GRIDHEIGHT, GRIDWIDTH, RED, TILESIZE
+from spatialIndex import TileIndex
 from tickers import Skill, StatusEffect
+from tileGrid import TileType
 from utils import get_squared_distance
 
-def get_tile(tile_map, x, y, tile_size=TILESIZE):
-    rect = pg.Rect(x*tile_size, y*tile_size, tile_size, tile_size)
-    return tile_map.subsurface(rect)
-
 class MobType(Enum):
     '''
     Player\n
@@ -33,13 +33,29 @@ class Direction(Enum):
     RIGHT = 4
 
 class Spritesheet:
+    '''
+    Use Spritesheet.load, it keeps one sheet per MobType
+    with every direction frame cropped, scaled and flipped
+    up front so sprites only have to look frames up
+    '''
+    loaded_sheets: dict[MobType, Spritesheet] = {}
+
     def __init__(self, mob_type: MobType):
         filename, pixel_size = self.get_spritesheet_data(mob_type)
-        try:
-            self.sheet = pg.image.load(filename).convert_alpha()
-            self.pixel_size = pixel_size
-        except pg.error as e:
-            raise FileNotFoundError(e)
+        self.sheet = load_image(filename)
+        self.pixel_size = pixel_size
+        self.images = {}
+
+        self.frames: dict[Direction, pg.Surface] = {}
+        for direction, (sprite_coordinate, x_offset, flip_x) in self.get_direction_frames(mob_type).items():
+            image = self.image_at(sprite_coordinate, x_offset)
+            self.frames[direction] = pg.transform.flip(image, flip_x=True, flip_y=False) if flip_x else image
+
+    @classmethod
+    def load(cls, mob_type: MobType) -> Spritesheet:
+        if mob_type not in cls.loaded_sheets:
+            cls.loaded_sheets[mob_type] = cls(mob_type)
+        return cls.loaded_sheets[mob_type]
         
     def get_spritesheet_data(self, mob_type: MobType) -> tuple[str, int]:
         if mob_type == MobType.Player:
@@ -50,8 +66,25 @@ class Spritesheet:
             return 'assets/Mob/Skeleton.png', 16
         else:
             raise ValueError(f'Mob {mob_type} has no spritesheet defined!')
+
+    def get_direction_frames(self, mob_type: MobType) -> dict[Direction, tuple[tuple[int, int], int, bool]]:
+        '''
+        direction -> (sprite coordinate, x offset, is flipped horizontally)
+        '''
+        if mob_type == MobType.Player:
+            return {
+                Direction.RIGHT: ((0, 0), 10, False),
+                Direction.LEFT: ((0, 0), -30, True),
+                Direction.UP: ((5, 7), 10, False),
+                Direction.DOWN: ((5, 5), 10, False),
+            }
+
+        return {direction: ((0, 0), 10, False) for direction in Direction}
         
     def image_at(self, sprite_coordinate: tuple, x_offset=10) -> pg.Surface:
+        if (sprite_coordinate, x_offset) in self.images:
+            return self.images[(sprite_coordinate, x_offset)]
+
         x, y = sprite_coordinate
         crop=30
         if self.pixel_size == 192:
@@ -68,6 +101,7 @@ class Spritesheet:
         else:
             image = pg.transform.scale(image, (TILESIZE, TILESIZE) )
 
+        self.images[(sprite_coordinate, x_offset)] = image
         return image
     
     def get_sprite(self, row: int, col: int) -> pg.Surface:
@@ -82,70 +116,35 @@ class Spritesheet:
 class GameObject(pg.sprite.Sprite):
     number_of_obejects=0
     def __init__(self, groups: Iterable, image: pg.Surface, x: int, y: int):
-        pg.sprite.Sprite.__init__(self, groups)
-        self.image = image
+        # position first, tile indexes file the sprite under it when it joins them
         self.x_pos = x
         self.y_pos = y
+        pg.sprite.Sprite.__init__(self, groups)
+        self.image = image
         self.rect = self.image.get_rect()
         self.id = GameObject.number_of_obejects
         GameObject.number_of_obejects+=1
 
     def place(self, new_pos: tuple[int, int]):
+        old_pos = self.get_position()
         self.x_pos = new_pos[0]
         self.y_pos = new_pos[1]
+        for group in self.groups():
+            if isinstance(group, TileIndex):
+                group.move(self, old_pos)
 
     def get_position(self)->tuple[int, int]:
         return self.x_pos, self.y_pos
 
-    def apply_tint(self, color):
-        """Apply a tint to the surface (light brown for example)."""
-        tint_surface = pg.Surface(self.image.get_size())
-        tint_surface.fill(color + (0,))  # Add transparency value (0 = fully opaque)
-        
-        # Blend the tint with the original image using alpha blending
-        self.image.blit(tint_surface, (0, 0), special_flags=pg.BLEND_RGBA_MULT)
-
     # temp: needs to be here as its the closest ancestor of both combat creature and map mob
     def init_behaviour(self, behaviour_tree: Dict[Callable, Callable]) -> BehaviourTree:
         return BehaviourTree(self, behaviour_tree)
     
 
-class Wall(GameObject):
-    def __init__(self, sprite_groups: Iterable, tile_map, x_pos: int, y_pos: int):
-        super().__init__(sprite_groups, 
-                            get_tile(tile_map, 1, 5),
-                            x_pos,
-                            y_pos
-                            )
-        self.rect.x = x_pos * TILESIZE
-        self.rect.y = y_pos * TILESIZE
-
-
-class Floor(GameObject):
-    def __init__(self, sprite_groups: Iterable, tile_map, x_pos: int, y_pos: int):
-        # Get the original floor tile from the tile map
-        floor_texture = get_tile(tile_map, 1, 1)
-
-        # Apply a brown tint to the floor texture (adjust the RGBA values as needed)
-        self.image = floor_texture.copy()
-        # self.apply_tint((132, 123, 109))
-        self.apply_tint((120, 105, 90))
-
-        super().__init__(sprite_groups, self.image, x_pos, y_pos)
-
-        self.rect.x = x_pos * TILESIZE
-        self.rect.y = y_pos * TILESIZE
-
-
 class MapExit(GameObject):
-    def __init__(self, game, sprite_groups: Iterable, tile_map, x_pos: int, y_pos: int):
-        floor_texture = get_tile(tile_map, 1, 7)
-
-        self.image = floor_texture.copy()
-        self.apply_tint((255, 150, 150))
-
+    def __init__(self, game, sprite_groups: Iterable, x_pos: int, y_pos: int):
         super().__init__(sprite_groups, 
-                            self.image,
+                            get_tile(TILEMAP_ELEVATION, 1, 7, tint=(255, 150, 150)),
                             x_pos,
                             y_pos
                             )
@@ -202,63 +201,47 @@ class Creature(GameObject):
         gains = self.class_table.level_up()
         for gain in gains:
             if isinstance(gain, list):
-                gain = self.game.enter_level_up_selection(gain)
+                # the pick is applied once it's made
+                self.game.enter_level_up_selection(gain, self.apply_gain)
+            else:
+                self.apply_gain(gain)
 
-            if issubclass(type(gain), ClassTable):
-                self.subclass = gain
-                self.class_table.subclass = gain
-                gain = self.class_table.subclass_levelup()
+        return gains
 
-            # temp: this shouldn't be a thing
-            if isinstance(gain, str) and gain == 'subclass_levelup':
-                gain = self.class_table.subclass_levelup()
+    def apply_gain(self, gain):
+        if issubclass(type(gain), ClassTable):
+            self.subclass = gain
+            self.class_table.subclass = gain
+            gain = self.class_table.subclass_levelup()
 
-            elif isinstance(gain, Skill):
-                self.skills.append(gain)
+        # temp: this shouldn't be a thing
+        if isinstance(gain, str) and gain == 'subclass_levelup':
+            gain = self.class_table.subclass_levelup()
 
-            elif isinstance(gain, StatusEffect):
-                self.passive_skills.append(gain)
-                gain.apply_effect(self)
+        elif isinstance(gain, Skill):
+            self.skills.append(gain)
 
-            elif isinstance(gain, tuple):
-                stat, amount = gain
-                self.attributes[stat] += amount
+        elif isinstance(gain, StatusEffect):
+            self.passive_skills.append(gain)
+            gain.apply_effect(self)
 
-        return gains
+        elif isinstance(gain, tuple):
+            stat, amount = gain
+            self.attributes[stat] += amount
         
     def get_level(self) -> int:
         return self.class_table.level
     
     def receive_damage(self, damage: int) -> int:
-        damage = max(0, damage - self.attributes['armour'])
-        if not damage:
-            return 0
-        
-        if self.attributes['resistance']:
-            damage //= 2
-
-        self.attributes['temporary_health'] -= damage
-        if self.attributes['temporary_health'] >= 0:
-            return 0
-
-        damage = self.attributes['temporary_health']*-1
-        self.attributes['temporary_health'] = 0
-        
-        self.attributes['health'] -= damage
-        if self.attributes['health'] <= 0:
+        damage = combat.absorb_damage(self.attributes, damage)
+        if damage and self.attributes['health'] <= 0:
             print(self.id, 'died!')
             self.die()
 
         return damage
     
     def deal_damage(self, target: Creature, is_crit: bool) -> dict[str, int]:
-        # temp: split into each dice for better reporting
-        roll = self.attributes['damage_dice'].roll(is_crit)
-        damage =  roll + self.attributes['damage']
-        target_recieved_damage = target.receive_damage(damage)
-        self_received_damage = self.receive_damage(target.attributes['biteback'])
-
-        return {'dealt': {'damage_roll': roll, 'damage_bonus': self.attributes['damage'], 'total_received': target_recieved_damage}, 'received': self_received_damage}
+        return combat.deal_damage(self, target, is_crit)
 
     def die(self):
         self.is_alive = False
@@ -285,11 +268,11 @@ class Creature(GameObject):
 
 
 class Player(Creature):
-    def __init__(self, game, groups: Iterable, collision_layers: tuple, init_x_pos: int, init_y_pos: int, classTable: ClassTable):
-        self.spritesheet = Spritesheet(MobType.Player)
+    def __init__(self, game, groups: Iterable, collision_layers: tuple, init_x_pos: int, init_y_pos: int, classTable: ClassTable, map=None):
+        self.spritesheet = Spritesheet.load(MobType.Player)
 
         super().__init__(game, groups, 
-                            self.spritesheet.image_at((0, 0)),
+                            self.spritesheet.frames[Direction.RIGHT],
                             init_x_pos, init_y_pos,
                             50, 5, 7, 18, 1, DiceGroup([Die(8)]),
                             classTable
@@ -297,6 +280,7 @@ class Player(Creature):
 
         self.name = 'Player'
         self.collision_layers = collision_layers
+        self.map = map
         self.direction = Direction.RIGHT
         self.combat_player = None
         self.meta_currency = 100 # meta currency
@@ -322,7 +306,7 @@ class Player(Creature):
         self.class_table.init_attack_method(self.combat_player.make_attack)
         self.level_up()
  
-    def interact(self, interactable_layer: pg.sprite.Group):
+    def interact(self, interactable_layer: TileIndex):
         interactable_pos_x, interactable_pos_y = self.x_pos, self.y_pos
         if self.direction == Direction.LEFT:
             interactable_pos_x-=1
@@ -333,10 +317,10 @@ class Player(Creature):
         else:
             interactable_pos_y+=1
         
-        for object in interactable_layer:
-            if object.x_pos == interactable_pos_x and object.y_pos == interactable_pos_y or object.x_pos == self.x_pos and object.y_pos == self.y_pos:
-                object.interact()
-                return
+        # whatever is in front of the player goes first, then whatever they stand on
+        object = interactable_layer.at((interactable_pos_x, interactable_pos_y)) or interactable_layer.at(self.get_position())
+        if object is not None:
+            object.interact()
   
     def move(self, key: pg.event):
         dx, dy = 0, 0
@@ -353,8 +337,7 @@ class Player(Creature):
         collision_object = self.collision(dx, dy)
 
         if collision_object is None:
-            self.x_pos += dx
-            self.y_pos += dy
+            self.place((self.x_pos+dx, self.y_pos+dy))
 
         elif isinstance(collision_object, MapMob):
             self.engage(collision_object)
@@ -369,11 +352,14 @@ class Player(Creature):
         elif dy < 0:
             self.direction = Direction.UP
         
-    def collision(self, dx=0, dy=0) -> GameObject:
+    def collision(self, dx=0, dy=0) -> GameObject | TileType:
+        if not self.map.check_if_pos_is_floor((self.x_pos+dx, self.y_pos+dy)):
+            return TileType.Wall
+
         for layer in self.collision_layers:
-            for object in layer:
-                if object.x_pos == self.x_pos+dx and object.y_pos == self.y_pos+dy:
-                    return object
+            object = layer.at((self.x_pos+dx, self.y_pos+dy))
+            if object is not None:
+                return object
 
         return None
 
@@ -384,14 +370,7 @@ class Player(Creature):
         super().update()
         self.rect.x = self.x_pos * TILESIZE
         self.rect.y = self.y_pos * TILESIZE
-        if self.direction == Direction.RIGHT:
-            self.image = self.spritesheet.image_at((0, 0))
-        elif self.direction == Direction.LEFT:
-            self.image = pg.transform.flip(self.spritesheet.image_at((0, 0), x_offset=-30), flip_x=True, flip_y=False)
-        if self.direction == Direction.UP:
-            self.image = self.spritesheet.image_at((5, 7))
-        elif self.direction == Direction.DOWN:
-            self.image = self.spritesheet.image_at((5, 5))
+        self.image = self.spritesheet.frames[self.direction]
 
     def tickers_update(self):
         super().tickers_update()
@@ -408,27 +387,13 @@ class CombatPlayer(Player):
         self.attributes = attributes
     
     def make_attack(self, target: Creature) -> dict[str, any]:
-        roll = Die(20).roll()
-        is_crit = roll >= self.attributes['crit_range']
-        is_hit = roll+self.attributes['attack'] >= target.attributes['defence']
-        damage_roll_info = {'dealt': {'damage_roll': 0, 'damage_bonus': 0, 'total_received': 0}, 'received': 0}
-        if is_hit:
-            damage_roll_info = self.deal_damage(target, is_crit)
-
-        return {'is_hit': is_hit, 'is_crit': is_crit, 'roll': roll, 'attack_bonus': self.attributes['attack'], 'damage': damage_roll_info}
+        return combat.make_attack(self, target)
     
-    def attack_action(self, target: Creature) -> list[dict]:
-        attack_data = []
-        for _ in range(self.attributes['attack_number']):
-            results = self.make_attack(target)
-            attack_data.append(results)
-
-        return results
+    def attack_action(self, target: Creature) -> dict[str, any]:
+        return combat.attack_action(self, target)
     
     def defend_action(self):
-        status_effect = StatusEffect("Defence", [('defence', 10)], 1)
-        self.status_effects.append(status_effect)
-        return status_effect.apply_effect(self)
+        return combat.defend_action(self)
 
     def skill_action(self, selected_skill: Skill, target: Creature) -> dict:
         return selected_skill.activate(target, self)
@@ -446,10 +411,13 @@ class CombatPlayer(Player):
         pass
 
 class MapMob(GameObject):
+    # in squares, also bounds the shared chase distance field
+    DETECTION_RANGE = 8
+
     def __init__(self, game, map, player, all_sprites_groups: pg.sprite.Group, all_map_mobs_group: pg.sprite.Group, init_x_pos: int, init_y_pos: int, mob_type: MobType):
-        self.spritesheet = Spritesheet(mob_type)
+        self.spritesheet = Spritesheet.load(mob_type)
         
-        super().__init__((all_sprites_groups, all_map_mobs_group), self.spritesheet.image_at((0, 0)), 
+        super().__init__((all_sprites_groups, all_map_mobs_group), self.spritesheet.frames[Direction.RIGHT], 
                          init_x_pos, init_y_pos,
                          )
         
@@ -461,11 +429,12 @@ class MapMob(GameObject):
         self.map = map
         self.player = player
 
-        self.pathfinder = Pathfinder(self.map)
+        self.pathfinder = self.map.get_pathfinder()
         ### separate class?
         self.path = []
         self.path_iterator = iter(self.path)
         ###
+        self.chase_planner: DStarLite = None
         self.last_known_player_pos = self.player.get_position()
         self.behaviour_tree = ...
       
@@ -500,13 +469,12 @@ class MapMob(GameObject):
 
     ###basic behaviour conditions
     def detect_player(self) -> bool:
-        # 8 squares range
-        return get_squared_distance(self.player.get_position(), self.get_position()) < 64
+        return get_squared_distance(self.player.get_position(), self.get_position()) < self.DETECTION_RANGE**2
         # return self.player.is_alive
     
     def in_engage_range(self) -> bool:
         ### needs to be here otherwise the mob doesn't refind path after attacking
-        self.update_path(self.last_known_player_pos)
+        self.update_chase_path()
         return get_squared_distance(self.get_position(), self.last_known_player_pos) <= 1
     ###
 
@@ -532,18 +500,45 @@ class MapMob(GameObject):
             self.path = self.pathfinder.find_path(self.get_position(), goal)[1:]
             self.path_iterator = iter(self.path)
     
+    def update_chase_path(self):
+        '''
+        chasing mobs walk down the distance field around the
+        player, a mob outside of it falls back to its own search
+        '''
+        if self.player.is_alive and self.player_has_moved() \
+                or not self.player.is_alive \
+                or not self.path:
+
+            self.update_last_known_player_pos()
+            field = self.pathfinder.get_distance_field(self.last_known_player_pos, self.DETECTION_RANGE)
+            path = field.path_from(self.get_position())
+            if path is None:
+                path = self.plan_chase(self.last_known_player_pos)
+
+            self.path = path
+            self.path_iterator = iter(self.path)
+
+    def plan_chase(self, target: tuple[int, int]) -> list[tuple[int, int]]:
+        '''
+        keeps one incremental search per chase, it is only
+        started over once the mob wanders off of it
+        '''
+        if self.chase_planner is not None:
+            path = self.chase_planner.path_to(target, self.get_position())
+            if path is not None:
+                return path
+
+        self.chase_planner = self.pathfinder.create_planner(self.get_position())
+        return self.chase_planner.path_to(target, self.get_position())
+
     def player_has_moved(self):
         return self.last_known_player_pos != self.player.get_position()
     
     def move(self, dx=0, dy=0):
-        self.x_pos += dx
-        self.y_pos += dy
+        self.place((self.x_pos+dx, self.y_pos+dy))
 
     def check_collisions(self, new_pos: tuple[int, int]):
-        for mob in self.all_map_mobs:
-            if mob.get_position() == new_pos:
-                return True
-        return False
+        return self.all_map_mobs.at(new_pos) is not None
     
     def update(self):
         self.rect.x = self.x_pos * TILESIZE
@@ -551,6 +546,7 @@ class MapMob(GameObject):
 
     def kill(self):
         self.path = []
+        self.chase_planner = None
         super().kill()
     
 
@@ -633,27 +629,13 @@ class CombatCreature(Creature):
         self.bahaviour_tree = ...
 
     def make_attack(self, target: Creature) -> dict[str, any]:
-        roll = Die(20).roll()
-        is_crit = roll >= self.attributes['crit_range']
-        is_hit = roll+self.attributes['attack'] >= target.attributes['defence']
-        damage_roll_info = {'dealt': {'damage_roll': 0, 'damage_bonus': 0, 'total_received': 0}, 'received': 0}
-        if is_hit:
-            damage_roll_info = self.deal_damage(target, is_crit)
-
-        return {'is_hit': is_hit, 'is_crit': is_crit, 'roll': roll, 'attack_bonus': self.attributes['attack'], 'damage': damage_roll_info}
-
-    def attack_action(self, target: Creature, *args) -> list[dict]:
-        attack_data = []
-        for _ in range(self.attributes['attack_number']):
-            results = self.make_attack(target)
-            attack_data.append(results)
-
-        return results
+        return combat.make_attack(self, target)
+
+    def attack_action(self, target: Creature, *args) -> dict[str, any]:
+        return combat.attack_action(self, target)
     
     def defend_action(self, target, *args) -> dict:
-        status_effect = StatusEffect("Defence", [('defence', 10)], 1)
-        self.status_effects.append(status_effect)
-        return status_effect.apply_effect(self)
+        return combat.defend_action(self)
     
     def fight(self) -> dict:
         self.start_bobbing()
@@ -692,8 +674,8 @@ class CombatCreature(Creature):
     def level_up(self):
         gains = super().level_up()
         for gain in gains:
-            self.replace_skill(gain)
             if isinstance(gain, Skill):
+                self.replace_skill(gain)
                 if gain.name in self.modify_behaviour_tree_dict:
                     self.modify_behaviour_tree(gain)
 
@@ -706,9 +688,13 @@ class CombatCreature(Creature):
 
     def start_bobbing(self):
         '''
-        Initiates the bobbing animation
+        Initiates the bobbing animation,
+        headless games skip it
         '''
-        self.bob_timer = pg.time.get_ticks()
+        if self.game.headless:
+            return
+
+        self.bob_timer = self.game.get_ticks()
         self.original_y = self.rect.y
 
     def update_bobbing(self) -> bool:
@@ -720,7 +706,7 @@ class CombatCreature(Creature):
         if self.bob_timer is None:
             return False
 
-        elapsed = pg.time.get_ticks() - self.bob_timer
+        elapsed = self.game.get_ticks() - self.bob_timer
         if elapsed < self.bob_duration:
             # Calculate interpolation between original_y and bob_offset
             progress = elapsed / self.bob_duration
@@ -743,7 +729,7 @@ class CombatCreature(Creature):
 class CombatSkeleton(CombatCreature):
     skeleton_counter=0
     def __init__(self, game, mobs_group: pg.sprite.Group, player: CombatPlayer, centre: tuple[int, int], level=1):
-        self.spritesheet = Spritesheet(MobType.Skeleton)
+        self.spritesheet = Spritesheet.load(MobType.Skeleton)
         CombatSkeleton.skeleton_counter+=1
         super().__init__(game, player, mobs_group, self.spritesheet.get_sprite(random.randint(0, 2), 0), 
                          0, 0, self.skeleton_counter,
@@ -68,9 +68,10 @@ class StatusEffect(Ticker):
             effect_stat, effect_value = effect
 
             if effect_stat == 'damage_dice':
-                dice = effect_value.dice if isinstance(effect_value, DiceGroup) else [effect_value]
-                for die in dice:
-                    target.attributes['damage_dice'].remove(die)
+                if isinstance(effect_value, DiceGroup):
+                    target.attributes['damage_dice'].remove_dice(effect_value)
+                else:
+                    target.attributes['damage_dice'].remove(effect_value)
                     
                 continue
 
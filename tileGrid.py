@@ -0,0 +1,171 @@
+from __future__ import annotations
+from enum import IntEnum
+import numpy as np
+
+
+class TileType(IntEnum):
+    Wall = 0
+    Floor = 1
+    Player = 2
+    Mob = 3
+    Map_Exit = 4
+
+
+class TileGrid:
+    '''
+    Contiguous uint8 grid of TileType values indexed
+    as [y][x], rows and columns are views into the
+    same buffer so they can be read and written
+    without copying
+    '''
+    def __init__(self, tile_width: int, tile_height: int, fill: TileType = TileType.Wall):
+        self.tiles = np.full((tile_height, tile_width), fill, dtype=np.uint8)
+
+    @classmethod
+    def from_array(cls, tiles: np.ndarray) -> TileGrid:
+        grid = cls.__new__(cls)
+        grid.tiles = np.ascontiguousarray(tiles, dtype=np.uint8)
+        return grid
+
+    @property
+    def width(self) -> int:
+        return self.tiles.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.tiles.shape[0]
+
+    def __getitem__(self, y: int) -> np.ndarray:
+        return self.tiles[y]
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __iter__(self):
+        return iter(self.tiles)
+
+    def __repr__(self):
+        return f'TileGrid({self.width}x{self.height})'
+
+    def row(self, y: int) -> np.ndarray:
+        return self.tiles[y]
+
+    def column(self, x: int) -> np.ndarray:
+        return self.tiles[:, x]
+
+    def is_within_bounds(self, x: int, y: int) -> bool:
+        height, width = self.tiles.shape
+        return 0 <= x < width and 0 <= y < height
+
+    def is_floor(self, pos: tuple[int, int]) -> bool:
+        x, y = pos
+        # item() hands back a python int, comparing a numpy scalar to the enum is ~30x slower
+        return self.is_within_bounds(x, y) and self.tiles.item(y, x) == TileType.Floor
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, tile: TileType):
+        self.tiles[y:y+height, x:x+width] = tile
+
+    def count(self, tile: TileType) -> int:
+        return int(np.count_nonzero(self.tiles == tile))
+
+    def positions_of(self, tile: TileType) -> list[tuple[int, int]]:
+        ys, xs = np.nonzero(self.tiles == tile)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def walkable(self) -> np.ndarray:
+        return self.tiles != TileType.Wall
+
+    def encase(self, tile: TileType = TileType.Wall):
+        self.tiles[[0, -1], :] = tile
+        self.tiles[:, [0, -1]] = tile
+
+    def copy(self) -> TileGrid:
+        return TileGrid.from_array(self.tiles.copy())
+
+    def label_regions(self, tile: TileType = TileType.Floor) -> RegionLabels:
+        '''
+        labels the 4-connected regions of the given tile type
+        in a single scanline pass, each row is split into runs
+        which are joined with the overlapping runs of the row above
+        '''
+        mask = np.zeros((self.height, self.width+2), dtype=np.int8)
+        mask[:, 1:-1] = self.tiles == tile
+        edges = np.diff(mask, axis=1)
+        run_y, run_start = np.nonzero(edges == 1)
+        run_end = np.nonzero(edges == -1)[1]
+        row_first_run = np.searchsorted(run_y, np.arange(self.height+1)).tolist()
+
+        parents = list(range(len(run_y)))
+        def find(run):
+            while parents[run] != run:
+                parents[run] = parents[parents[run]]
+                run = parents[run]
+            return run
+
+        starts, ends = run_start.tolist(), run_end.tolist()
+        for y in range(1, self.height):
+            above, above_end = row_first_run[y-1], row_first_run[y]
+            current, current_end = row_first_run[y], row_first_run[y+1]
+            while above < above_end and current < current_end:
+                if starts[above] < ends[current] and starts[current] < ends[above]:
+                    root_above, root_current = find(above), find(current)
+                    if root_above != root_current:
+                        parents[max(root_above, root_current)] = min(root_above, root_current)
+
+                if ends[above] < ends[current]:
+                    above += 1
+                else:
+                    current += 1
+
+        # roots are the first run of each region so sorting them keeps scan order
+        roots = np.array([find(run) for run in range(len(parents))], dtype=np.int64)
+        run_labels = (np.unique(roots, return_inverse=True)[1] + 1).astype(np.int32)
+        number_of_regions = int(run_labels.max()) if len(run_labels) else 0
+
+        labels = np.zeros((self.height, self.width+1), dtype=np.int32)
+        np.add.at(labels, (run_y, run_start), run_labels)
+        np.add.at(labels, (run_y, run_end), -run_labels)
+        labels = np.cumsum(labels, axis=1, dtype=np.int32)[:, :-1]
+
+        sizes = np.bincount(run_labels, weights=run_end-run_start, minlength=number_of_regions+1).astype(np.int64)
+        bounding_boxes = np.zeros((number_of_regions+1, 4), dtype=np.int64)
+        bounding_boxes[1:, :2] = np.iinfo(np.int64).max
+        np.minimum.at(bounding_boxes[:, 0], run_labels, run_start)
+        np.minimum.at(bounding_boxes[:, 1], run_labels, run_y)
+        np.maximum.at(bounding_boxes[:, 2], run_labels, run_end-1)
+        np.maximum.at(bounding_boxes[:, 3], run_labels, run_y)
+
+        return RegionLabels(labels, sizes, bounding_boxes)
+
+
+class RegionLabels:
+    '''
+    labels: grid of region ids, 0 marks tiles outside of any region\n
+    sizes: number of tiles per region id\n
+    bounding_boxes: inclusive (x0, y0, x1, y1) per region id
+    '''
+    def __init__(self, labels: np.ndarray, sizes: np.ndarray, bounding_boxes: np.ndarray):
+        self.labels = labels
+        self.sizes = sizes
+        self.bounding_boxes = bounding_boxes
+
+    def __len__(self) -> int:
+        return len(self.sizes) - 1
+
+    def __repr__(self):
+        return f'RegionLabels({len(self)} regions)'
+
+    def largest(self) -> int:
+        '''
+        id of the biggest region (the first one in scan order on ties),
+        0 if there are no regions
+        '''
+        return int(np.argmax(self.sizes)) if len(self) else 0
+
+    def label_at(self, pos: tuple[int, int]) -> int:
+        x, y = pos
+        return int(self.labels[y, x])
+
+    def are_connected(self, pos1: tuple[int, int], pos2: tuple[int, int]) -> bool:
+        label = self.label_at(pos1)
+        return label != 0 and label == self.label_at(pos2)